@@ -18,18 +18,22 @@ import random
 import math
 import copy
 import sys
+import time
 import numpy as np
 import itertools
 import enemy_ships
 import collections
-
-# GAME START
-# Here we define the bot's name as Settler and initialize the game, including communication with the Halite engine.
-# this configures # logging to be compatible with halite
-game = hlt.Game("Settler")
+import contextlib
+import parallel_planning
+import combat
+import squads
+import docking
+import production
 
 # higher numbers make a planet LESS desirable
 # is_mine and not is_full | is_mine and is_full |  is_others | (0.5 - is_others)*planet.radius | count_in_targets | distance | closer_than_threshold
+# chosen while planet_features compared the owning Player to our id, so our own planets scored as
+# is_others; since the ids are compared they score as is_mine (see tune_weights.py to retune)
 PLANET_SCORING_WEIGHTS = np.array([[-50], [2000], [100], [-2], [200], [1], [-50]])
 
 def planet_weights(ship, planets):
@@ -46,10 +50,11 @@ def planet_weights(ship, planets):
                int(distance < 14))
 
 def planet_features(planet, my_id):
-    is_owned = planet.is_owned()
-    is_mine = is_owned and planet.owner == my_id
+    # planet.owner is the linked Player: compare ids, as tune_weights does on the rows
+    is_owned = planet.is_owned() and planet.owner is not None
+    is_mine = is_owned and planet.owner.id == my_id
     is_full = planet.is_full()
-    is_others = int(is_owned and planet.owner != my_id)
+    is_others = int(is_owned and planet.owner.id != my_id)
     # NOTE NOT MEANINGFULLY COMBINABLE WITH WEIGHTS
     return np.array(
         [int(is_mine and not is_full), int(is_mine and is_full), is_others, (0.5 - is_others)*planet.radius, planet.x, planet.y ])
@@ -71,18 +76,13 @@ def count_in_targets(ship_targets):
     """
     return collections.Counter(ship_targets.values())
 
-def score_all_planets_for_one_ship(ship, planets, planet_features, planet_positions, ship_targets,
-                                       weights=PLANET_SCORING_WEIGHTS):
+def score_all_planets_for_one_ship(ship, planets, planet_features, ship_targets, weights=PLANET_SCORING_WEIGHTS):
     """
     planets should be list like - position will be used to retrieve the least scoring planet
     """
-    ship_position_once = np.array([ship.x, ship.y])
-    # repeat positions vertically
-    ship_position = np.tile(ship_position_once, (len(planets),1))
-
-    planet_distances = np.linalg.norm((planet_positions - ship_position), axis=1)
+    # from the map's distance table, shared with the rest of the turn
     # make a column vector so we can hstack
-    planet_distances.shape = (len(planet_distances), 1)
+    planet_distances = hlt.distances.pairwise([ship], planets).T
     planet_closer_than_threshold = (planet_distances < PLANET_ATTRACTION_THRESHOLD).astype(int)
     target_counts = count_in_targets(ship_targets)
     planet_target_counts = np.array([target_counts.get(planet, 0) for planet in planets])
@@ -102,62 +102,171 @@ def monotonic_deflections(seed=0, deflection_range=math.pi/32):
         deflection += random.uniform(0, deflection_range)
         yield deflection
 
-# maps planets -> ships trying to dock on them
-dock_attempts = {}
+# squads smaller than this are planned ship by ship
+SQUAD_MIN_SIZE = 3
 
-while True:
-    # TURN START
-    # Update the map for the new turn and get the latest version
-    game_map = game.update_map()
-    # make changes to reflect what we intend to do
-    #future_game_map = copy.deepcopy(game_map)
+class BotState:
+    """
+    Everything the bot carries from one turn to the next, so turns can be played on any map
+    (see play_turn) and several games can be played in one process
+    """
 
+    def __init__(self):
+        self.turn = 0
+        # reuses each ship's heading across turns while its target and surroundings are unchanged
+        self.navigation_cache = hlt.navigation.NavigationCache()
+        # groups ships into squads that are planned as one, keeping squad ids across turns
+        self.squad_tracker = squads.SquadTracker()
+        # spreads ships heading to a planet over its docking spots
+        self.docking_slots = docking.DockingSlots()
+        # forecasts every player's spawns from planet production
+        self.production_forecast = production.ProductionForecast()
 
-    # maps ships -> targets
-    ship_targets = {}
+# plan ships on a pool of worker processes when more than one core is available
+PARALLEL_PLANNING = False
+# record every turn to this file for post-game analysis ({tag} is our player tag), or None
+RECORD_TO = None
+# freeze the start-up objects and collect garbage between turns instead of during them
+MANAGE_GC = False
+# log the memory hlt code allocates in each phase of every turn (slow)
+TRACE_ALLOCATIONS = False
+# parse frames into arrays and build only the ships and planets we look at
+LAZY_PARSE = False
+
+def can_dock_on(ship, planet):
+    """
+    True if the ship is close enough to dock and the planet is free, or ours and not full
+    """
+    return (
+        # distance is good
+        ship.can_dock(planet) and
+        # don't try to dock on a planet someone else owns
+        not (planet.is_owned() and planet.owner != ship.owner) and
+        not (planet.is_owned() and planet.owner == ship.owner and planet.is_full()))  # TODO: Don't have our own ships conflict each other
+
+def approach_point(ship, target_object, state):
+    """
+    Where to fly to reach the target: a free docking slot for planets (if there is one), else the closest point
+    """
+    if isinstance(target_object, hlt.entity.Planet):
+        slot = state.docking_slots.assign(ship, target_object)
+        if slot is not None:
+            return slot
+    else:
+        state.docking_slots.release(ship)
+    return ship.closest_point_to(target_object)
+
+def navigate_to(ship, target_object, game_map, state):
+    """
+    Navigate towards the target's approach point at full speed, return the command or None
+    """
+    return ship.navigate(
+        approach_point(ship, target_object, state),
+        game_map,
+        speed=int(hlt.constants.MAX_SPEED),
+        ignore_ships=False,
+        angle_dodges=None,
+        angular_step=8,
+        cache=state.navigation_cache)
+
+def plan_squad(squad, game_map, planets, planet_features, ship_targets, state):
+    """
+    Plan a squad as one: the leader picks the planet and the route, the others dock if they can
+    or follow at the leader's speed and heading (keeping their offset in the formation), falling
+    back to their own navigation when something outside the squad is in their way
+    return the list of commands for the squad
+    """
+    leader = squad.leader
+    planet = score_all_planets_for_one_ship(leader, planets, planet_features, ship_targets)
+    target_object = planet
+    if planet.is_owned() and planet.owner != leader.owner:
+        # attack the weakest docked ship
+        target_object = min(planet.all_docked_ships(), key=lambda docked: docked.health)
+
+    command_queue = []
+    movers = []
+    for ship in squad.ships:
+        ship_targets[ship] = target_object
+        if can_dock_on(ship, planet) and state.docking_slots.try_dock(ship, planet):
+            command_queue.append(ship.dock(planet))
+        else:
+            movers.append(ship)
+    if leader not in movers:
+        # the leader is docking: the others make their own way
+        for ship in movers:
+            navigate_command = navigate_to(ship, target_object, game_map, state)
+            if navigate_command:
+                command_queue.append(navigate_command)
+        return command_queue
 
-    # statefully generate increasing deflections for obstacle avoidance
-    deflections = monotonic_deflections()
+    route = navigate_to(leader, target_object, game_map, state)
+    if route is None:
+        return command_queue
+    _, _, speed, angle = route.split()
+    speed, angle = int(speed), int(angle)
+    dx, dy = speed * math.cos(math.radians(angle)), speed * math.sin(math.radians(angle))
+    squad_ships = set(squad.ships)
+    for ship in movers:
+        end = hlt.entity.Position(ship.x + dx, ship.y + dy)
+        if ship is leader or not [obstacle for obstacle in game_map.obstacles_between(ship, end)
+                                  if obstacle not in squad_ships]:
+            command_queue.append(ship.thrust(speed, angle))
+        else:
+            navigate_command = navigate_to(ship, target_object, game_map, state)
+            if navigate_command:
+                command_queue.append(navigate_command)
+    return command_queue
 
+def plan_ships(game_map, ships, state):
+    """
+    Plan one turn for the given (undocked) ships of ours, reading and updating the given BotState
+    return the list of commands for those ships
+    """
+    # maps ships -> targets
+    ship_targets = {}
 
     # Here we define the set of commands to be sent to the Halite engine at the end of the turn
     command_queue = []
-    # For every ship that I control
-    ships = game_map.get_me().all_ships() #[:]
     planets = game_map.all_planets()
 
     all_planet_features_this_round = all_planet_features(planets, game_map.my_id)
-    planet_positions = all_planet_features_this_round[:, [PLANET_X, PLANET_Y]]
 
-    try:
-        nearby_enemy_ships = enemy_ships.check_enemy_distances(ships, game_map.all_ships())
-    except ValueError:
-        nearby_enemy_ships = {}
+    # from the map's rows and distance table, so a lazily parsed map only builds the enemies nearby
+    nearby_enemy_ships = enemy_ships.check_map_enemy_distances(ships, game_map)
+    engagements = combat.plan_map_engagements(ships, game_map)
+    state.docking_slots.start_turn(game_map)
+
+    # ships in blobs away from the enemy are planned per squad
+    squadable = [ship for ship in ships
+                 if ship.docking_status == ship.DockingStatus.UNDOCKED and not nearby_enemy_ships.get(ship)]
+    planned = set()
+    for squad in state.squad_tracker.update(squadable):
+        if len(squad) >= SQUAD_MIN_SIZE:
+            command_queue.extend(plan_squad(
+                squad, game_map, planets, all_planet_features_this_round, ship_targets, state))
+            planned.update(squad.ships)
         
     # random.shuffle(ships)
     for ship in ships:
         target_object = None
+        navigate_command = None
         # TODO: Optimally Allocate ships between planets
         # If the ship is docked
-        if ship.docking_status != ship.DockingStatus.UNDOCKED:
+        if ship.docking_status != ship.DockingStatus.UNDOCKED or ship in planned:
             # Skip this ship
             continue
 
-        # if an enemy ship is close, target that, else target planets
-        if ship in nearby_enemy_ships and len(nearby_enemy_ships[ship]) > 0:
-            target_object = nearby_enemy_ships[ship][0]
+        # if an enemy ship is close and the fight looks winnable, attack the enemy forecast to end up weakest,
+        # else target planets
+        enemy_target = engagements.get(ship, nearby_enemy_ships[ship][0]) if nearby_enemy_ships.get(ship) else None
+        if enemy_target is not None:
+            target_object = enemy_target
         else:
-            planet = score_all_planets_for_one_ship(ship, planets, all_planet_features_this_round, planet_positions, ship_targets)
+            planet = score_all_planets_for_one_ship(ship, planets, all_planet_features_this_round, ship_targets)
             # logging.debug("Processing planet {}".format(n))
             # If we can dock, let's (try to) dock. If two ships try to dock at once, neither will be able to.
-            if (
-                    # distance is good
-                    ship.can_dock(planet) and
-                    # don't try to dock on a planet someone else owns
-                    not (planet.is_owned() and planet.owner != ship.owner) and
-                    not (planet.is_owned() and planet.owner == ship.owner and planet.is_full())):  # TODO: Don't have our own ships conflict each other
+            if can_dock_on(ship, planet) and state.docking_slots.try_dock(ship, planet):
                 # We add the command by appending it to the command_queue
-                # dock_attempts[planet] = ship
                 command_queue.append(ship.dock(planet))
                 target_object = ship
                 continue
@@ -175,25 +284,95 @@ while True:
 
                 target_object = planet
                 if planet.is_owned() and planet.owner != ship.owner:
-                    # attack the docked ships
-                    target_object = planet.all_docked_ships()[0]
+                    # attack the weakest docked ship
+                    target_object = min(planet.all_docked_ships(), key=lambda docked: docked.health)
 
         ship_targets[ship] = target_object
         if target_object:
-            navigate_command = ship.navigate(
-                ship.closest_point_to(target_object),
-                game_map,
-                speed=int(hlt.constants.MAX_SPEED),
-                ignore_ships=False,
-                angle_dodges=None,
-                angular_step=8)
+            navigate_command = navigate_to(ship, target_object, game_map, state)
         # If the move is possible, add it to the command_queue (if there are too many obstacles on the way
         # or we are trapped (or we reached our destination!), navigate_command will return null;
         # don't fret though, we can run the command again the next turn)
         if navigate_command:
             command_queue.append(navigate_command)
         # logging.debug("Processed all planets for ship {}".format(ship))
-    # Send our set of commands to the Halite engine for this turn
-    game.send_command_queue(command_queue)
-    # TURN END
-# GAME END
+    return command_queue
+
+def play_turn(game_map, state, planner=None, phase=None):
+    """
+    Play one turn on the given map: bring the state up to date and plan all our ships,
+    with the parallel_planning.TurnPlanner if one is given (which only shares the state's
+    docking slots with its workers, see parallel_planning)
+    phase is a context manager factory timing the forecast and plan phases, e.g. Game.phase
+    return the list of commands to send
+    """
+    phase = phase or (lambda name: contextlib.nullcontext())
+    state.turn += 1
+    with phase('forecast'):
+        state.production_forecast.update(game_map, state.turn)
+    with phase('plan'):
+        ships = game_map.get_me().all_ships()
+        if planner:
+            command_queue = planner.plan(game_map, state)
+        else:
+            command_queue = plan_ships(game_map, ships, state)
+        state.navigation_cache.prune(ship.id for ship in ships)
+    return command_queue
+
+def warm_planning(game_map, deadline):
+    """
+    Plan the initial map ship by ship until the deadline, so numpy, scipy and the planning code are warm
+    for the first turn. Plans on a throwaway state, so the first turn starts from a clean one
+    """
+    state = BotState()
+    for ship in game_map.get_me().all_ships():
+        if time.perf_counter() >= deadline:
+            return
+        plan_ships(game_map, [ship], state)
+
+def main(transport=None):
+    # the state of this game, fresh for every game played in the process
+    bot_state = BotState()
+    planners = []
+    def start_planner(game_map, deadline):
+        planners.append(parallel_planning.TurnPlanner(game_map, plan_ships, BotState, navigate_to))
+
+    # GAME START
+    # Here we define the bot's name as Settler and initialize the game, including communication with the Halite engine.
+    # this configures # logging to be compatible with halite
+    # The warm-up runs on the initial map before our name is sent
+    game = hlt.Game("Settler", warm_up=[bot_state.docking_slots.build, hlt.warmup.warm_kernels, hlt.selection.calibrate,
+                                        warm_planning] + (
+        [start_planner] if PARALLEL_PLANNING else []), record_to=RECORD_TO, transport=transport,
+        manage_gc=MANAGE_GC, trace_allocations=TRACE_ALLOCATIONS, lazy_parse=LAZY_PARSE)
+    planner = planners[0] if planners else None
+
+    try:
+        while True:
+            # TURN START
+            # Update the map for the new turn and get the latest version
+            try:
+                game_map = game.update_map()
+            except hlt.networking.GameOver:
+                break
+            # make changes to reflect what we intend to do
+            #future_game_map = copy.deepcopy(game_map)
+
+            # For every ship that I control
+            command_queue = play_turn(game_map, bot_state, planner, game.phase)
+            # Send our set of commands to the Halite engine for this turn
+            game.send_command_queue(command_queue)
+            bot_state.navigation_cache.log_stats()
+            forecast = bot_state.production_forecast
+            player_ids, fleet_counts = forecast.fleet_counts(game_map)
+            logging.info("Forecast fleets in {} turns: {}".format(
+                forecast.horizon, dict(zip(player_ids.tolist(), fleet_counts[:, -1].tolist()))))
+            # TURN END
+    finally:
+        # stop the workers and free the shared memory
+        if planner:
+            planner.close()
+    # GAME END
+
+if __name__ == "__main__":
+    main()
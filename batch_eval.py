@@ -0,0 +1,141 @@
+"""
+Offline batch evaluation of the bot's turn logic.
+
+Plays MyBot.play_turn on many frames in one process, or spread over a process pool, and
+reports the throughput in turns per second. Frames come from recordings (see hlt.recorder)
+or are generated at random. The frames of one game are played in order on one BotState;
+games are independent, so they are what gets spread over the pool.
+
+    python batch_eval.py [recording ...] [--generate GAMES] [--turns TURNS] [--workers WORKERS]
+"""
+import argparse
+import collections
+import multiprocessing
+import time
+
+import numpy as np
+
+import hlt
+from hlt import arrays, constants
+import MyBot
+import parallel_planning
+
+#: One turn's input: ship and planet rows with the hlt.arrays columns
+Frame = collections.namedtuple('Frame', 'my_id width height player_ids ships planets')
+#: Result of a batch: the commands of every turn of every game, and the time spent playing them
+Evaluation = collections.namedtuple('Evaluation', 'commands turns seconds')
+
+
+def load_game(path):
+    """
+    Read the frames of a recording (see hlt.recorder)
+    return list of Frames
+    """
+    recording = hlt.recorder.load(path)
+    player_ids = set()
+    for turn in recording.turns:
+        player_ids.update(turn.ships[:, arrays.SHIP_OWNER].astype(int).tolist())
+    return [Frame(recording.my_id, recording.width, recording.height, sorted(player_ids),
+                  np.array(turn.ships), np.array(turn.planets)) for turn in recording.turns]
+
+
+def random_frame(rng, width=240, height=160, players=2, ships_per_player=20, planets=12):
+    """
+    A random frame: planets spread over the map without overlapping, undocked ships around them
+    """
+    planet_rows = []
+    while len(planet_rows) < planets:
+        radius = rng.uniform(3, 8)
+        x, y = rng.uniform(radius + 5, width - radius - 5), rng.uniform(radius + 5, height - radius - 5)
+        if all(np.hypot(x - row[arrays.PLANET_X], y - row[arrays.PLANET_Y]) > radius + row[arrays.PLANET_RADIUS] + 10
+               for row in planet_rows):
+            row = np.zeros(arrays.PLANET_COLUMNS)
+            row[[arrays.PLANET_ID, arrays.PLANET_X, arrays.PLANET_Y, arrays.PLANET_HEALTH, arrays.PLANET_RADIUS,
+                 arrays.PLANET_DOCKING_SPOTS, arrays.PLANET_OWNER]] = (
+                len(planet_rows), x, y, 1000, radius, int(radius / 2) + 1, arrays.NONE)
+            planet_rows.append(row)
+    planet_rows = np.array(planet_rows)
+
+    ships = np.zeros((players * ships_per_player, arrays.SHIP_COLUMNS))
+    ships[:, arrays.SHIP_OWNER] = np.repeat(np.arange(players), ships_per_player)
+    ships[:, arrays.SHIP_ID] = np.arange(len(ships))
+    ships[:, arrays.SHIP_HEALTH] = constants.BASE_SHIP_HEALTH
+    ships[:, arrays.SHIP_PLANET] = arrays.NONE
+    # keep ships clear of the planets
+    placed = 0
+    while placed < len(ships):
+        x, y = rng.uniform(1, width - 1), rng.uniform(1, height - 1)
+        clearance = np.hypot(planet_rows[:, arrays.PLANET_X] - x, planet_rows[:, arrays.PLANET_Y] - y) - \
+            planet_rows[:, arrays.PLANET_RADIUS]
+        if clearance.min() > 2:
+            ships[placed, arrays.SHIP_X], ships[placed, arrays.SHIP_Y] = x, y
+            placed += 1
+    return Frame(0, width, height, list(range(players)), ships, planet_rows)
+
+
+def generate_games(games, turns=1, seed=0, **kwargs):
+    """
+    Random games of the given number of turns, each turn a new random frame
+    return list of lists of Frames
+    """
+    rng = np.random.default_rng(seed)
+    return [[random_frame(rng, **kwargs) for _ in range(turns)] for _ in range(games)]
+
+
+def play_game(frames, play=MyBot.play_turn):
+    """
+    Play the frames of one game in order, on a fresh state
+    return the list of each turn's commands, and the seconds spent in play
+    """
+    state = MyBot.BotState()
+    commands = []
+    seconds = 0.0
+    for frame in frames:
+        game_map = hlt.game_map.Map(frame.my_id, frame.width, frame.height)
+        game_map._load_arrays(frame.ships, frame.planets, frame.player_ids)
+        start = time.perf_counter()
+        commands.append(play(game_map, state))
+        seconds += time.perf_counter() - start
+    return commands, seconds
+
+
+def evaluate(games, workers=1, play=MyBot.play_turn):
+    """
+    Play every game, on a pool of workers processes if there is more than one
+    play must be a module level function so it can be sent to the workers
+    return an Evaluation; seconds is the wall time when playing on a pool
+    """
+    turns = sum(len(frames) for frames in games)
+    start = time.perf_counter()
+    if workers > 1:
+        with multiprocessing.get_context().Pool(workers) as pool:
+            results = pool.starmap(play_game, [(frames, play) for frames in games])
+        seconds = time.perf_counter() - start
+    else:
+        results = [play_game(frames, play) for frames in games]
+        seconds = sum(game_seconds for (_, game_seconds) in results)
+    return Evaluation([game_commands for (game_commands, _) in results], turns, seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play the bot's turn logic on many frames and report turns per second")
+    parser.add_argument('recordings', nargs='*', help="recorded games to play (see hlt.recorder)")
+    parser.add_argument('--generate', type=int, default=0, help="number of random games to play")
+    parser.add_argument('--turns', type=int, default=1, help="turns per random game")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes, 0 for one per available core")
+    args = parser.parse_args()
+
+    games = [load_game(path) for path in args.recordings]
+    games.extend(generate_games(args.generate, args.turns, args.seed))
+    workers = args.workers or parallel_planning.available_cores()
+    evaluation = evaluate(games, workers)
+    commands = sum(len(turn) for game in evaluation.commands for turn in game)
+    print("{} games, {} turns, {} commands in {:.3f}s: {:.1f} turns/s on {} worker(s)".format(
+        len(games), evaluation.turns, commands, evaluation.seconds,
+        evaluation.turns / evaluation.seconds if evaluation.seconds else float('inf'), workers))
+
+
+if __name__ == "__main__":
+    main()
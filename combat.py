@@ -0,0 +1,174 @@
+import collections
+import numpy as np
+import scipy.sparse.csgraph
+import hlt
+from hlt import arrays, constants
+from hlt.entity import Ship
+
+# ships within this distance of an enemy are part of the same engagement
+CONTACT_RADIUS = constants.WEAPON_RADIUS + constants.MAX_SPEED
+# ships are assumed to close in, so anything within a turn's move of weapon range gets shot at
+FIRING_RADIUS = constants.WEAPON_RADIUS + 2 * constants.SHIP_RADIUS + constants.MAX_SPEED
+FORECAST_TURNS = 3
+
+# padded per-cluster arrays, C clusters x K members; members indexes the ship list, -1 for padding
+Clusters = collections.namedtuple('Clusters', 'members mask owners health cooldown can_fire distances')
+
+
+def contact_clusters(ships, contact_radius=CONTACT_RADIUS):
+    """
+    Group ships into contact clusters: connected components of ships within contact_radius
+    of each other, keeping only clusters with more than one owner
+    return Clusters
+    """
+    if len(ships) == 0:
+        return _empty_clusters()
+    # from the map's distance table when the ships share one
+    return row_clusters(arrays.ships_to_array(ships), hlt.distances.pairwise(ships, ships), contact_radius)
+
+
+def row_clusters(rows, ship_distances, contact_radius=CONTACT_RADIUS):
+    """
+    contact_clusters of ship rows (see hlt.arrays) given their ships x ships distances, without any ship objects;
+    members index the rows
+    return Clusters
+    """
+    if len(rows) == 0:
+        return _empty_clusters()
+    owners = rows[:, arrays.SHIP_OWNER].astype(int)
+    adjacency = ship_distances <= contact_radius
+    _, labels = scipy.sparse.csgraph.connected_components(adjacency, directed=False)
+
+    # keep clusters where some pair of ships has different owners
+    first_owner = np.full(labels.max() + 1, -1)
+    first_owner[labels] = owners
+    contested = np.zeros(labels.max() + 1, dtype=bool)
+    np.logical_or.at(contested, labels, owners != first_owner[labels])
+    keep = np.flatnonzero(contested[labels])
+    if len(keep) == 0:
+        return _empty_clusters()
+
+    # rank ships within their cluster to get a padded layout
+    _, cluster = np.unique(labels[keep], return_inverse=True)
+    order = np.argsort(cluster, kind='stable')
+    counts = np.bincount(cluster)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(len(order)) - starts[cluster[order]]
+    members = np.full((len(counts), counts.max()), -1)
+    members[cluster[order], rank] = keep[order]
+
+    mask = members >= 0
+    index = np.where(mask, members, 0)
+    undocked = rows[:, arrays.SHIP_DOCKING_STATUS] == Ship.DockingStatus.UNDOCKED.value
+    cooldown = rows[:, arrays.SHIP_COOLDOWN].astype(int)
+    health = rows[:, arrays.SHIP_HEALTH]
+    distances = ship_distances[index[:, :, np.newaxis], index[:, np.newaxis, :]]
+    return Clusters(members, mask, np.where(mask, owners[index], -1), np.where(mask, health[index], 0.0),
+                    np.where(mask, cooldown[index], 0), mask & undocked[index], distances)
+
+
+def _empty_clusters():
+    empty = np.empty((0, 0))
+    return Clusters(empty.astype(int), empty.astype(bool), empty.astype(int), empty, empty.astype(int),
+                    empty.astype(bool), np.empty((0, 0, 0)))
+
+
+def _owner_id(ship):
+    return getattr(ship.owner, 'id', ship.owner)
+
+
+def simulate(clusters, present, turns=FORECAST_TURNS, firing_radius=FIRING_RADIUS):
+    """
+    Forecast the health of every cluster member after some turns of fighting, for a batch of
+    scenarios at once. Each turn every ship that can fire and whose weapon has cooled down
+    splits WEAPON_DAMAGE evenly between the enemies in range.
+    present is a S x C x K boolean array of which members take part in each scenario
+    return S x C x K array of health (members not present keep their health)
+    """
+    enemies = ((clusters.owners[:, :, np.newaxis] != clusters.owners[:, np.newaxis, :]) &
+               clusters.mask[:, :, np.newaxis] & clusters.mask[:, np.newaxis, :] &
+               (clusters.distances <= firing_radius))
+    health = np.broadcast_to(clusters.health, present.shape).copy()
+    cooldown = np.broadcast_to(clusters.cooldown, present.shape).copy()
+    for _ in range(turns):
+        # as the engine does: weapons cool down at the start of the turn, then fire if ready
+        cooldown = np.maximum(cooldown - 1, 0)
+        alive = present & (health > 0)
+        firing = alive & clusters.can_fire & (cooldown == 0)
+        # S x C x attacker x target
+        shots = enemies & firing[:, :, :, np.newaxis] & alive[:, :, np.newaxis, :]
+        targets = shots.sum(axis=3, keepdims=True)
+        damage = np.divide(constants.WEAPON_DAMAGE * shots, targets,
+                           out=np.zeros(shots.shape), where=targets > 0).sum(axis=2)
+        health = np.where(alive, np.maximum(health - damage, 0), health)
+        cooldown = np.where(firing, constants.WEAPON_COOLDOWN, cooldown)
+    return health
+
+
+def engagement_values(clusters, my_id, turns=FORECAST_TURNS):
+    """
+    Score engaging against retreating for every cluster at once. In the retreat scenario our
+    undocked ships leave the fight (keeping their health) while our docked ships stay.
+    Scores are our remaining health minus the enemy's, as a fraction of MAX_SHIP_HEALTH.
+    return (engage, retreat) arrays with one score per cluster
+    """
+    mine = clusters.owners == my_id
+    retreating = mine & clusters.can_fire
+    present = np.stack((clusters.mask, clusters.mask & ~retreating))
+    health = simulate(clusters, present, turns)
+    balance = np.where(mine, health, -health).sum(axis=2) / constants.MAX_SHIP_HEALTH
+    return balance[0], balance[1]
+
+
+def plan_engagements(myships, all_ships, turns=FORECAST_TURNS):
+    """
+    Decide, for each of my ships that is in contact with the enemy, whether to engage and whom to shoot at
+    return dict of my ships to the enemy ship to attack, or None to retreat
+    """
+    if len(myships) <= 0:
+        return {}
+    return _engagements(myships, contact_clusters(all_ships), all_ships.__getitem__, turns)
+
+
+def plan_map_engagements(myships, game_map, turns=FORECAST_TURNS):
+    """
+    plan_engagements against every ship of the map, from its ship rows and distance table:
+    only the ships of contested clusters are built
+    return dict of my ships to the enemy ship to attack, or None to retreat
+    """
+    if len(myships) <= 0:
+        return {}
+    table = game_map.distances
+    ships, _ = game_map.frame_rows()
+    clusters = row_clusters(ships, table.ship_distances())
+    return _engagements(myships, clusters, lambda row: table.entity(table.num_planets() + row), turns)
+
+
+def _engagements(myships, clusters, ship_at, turns):
+    """
+    ship_at gives the ship of a cluster member
+    """
+    my_id = _owner_id(myships[0])
+    if len(clusters.members) == 0:
+        return {}
+    engage, retreat = engagement_values(clusters, my_id, turns)
+    forecast = simulate(clusters, clusters.mask[np.newaxis], turns)[0]
+
+    # each of my ships attacks the in-range enemy forecast to end up weakest
+    enemy = clusters.mask & (clusters.owners != my_id)
+    reach = clusters.distances <= FIRING_RADIUS
+    candidate = np.where(enemy[:, np.newaxis, :] & reach, forecast[:, np.newaxis, :], np.inf)
+    weakest = candidate.argmin(axis=2)
+    has_target = np.isfinite(candidate.min(axis=2))
+
+    mine = set(myships)
+    results = {}
+    for cluster, row in zip(*np.nonzero(clusters.mask & (clusters.owners == my_id))):
+        ship = ship_at(clusters.members[cluster, row])
+        if ship not in mine or not has_target[cluster, row]:
+            continue
+        if engage[cluster] >= retreat[cluster]:
+            results[ship] = ship_at(clusters.members[cluster, weakest[cluster, row]])
+        else:
+            results[ship] = None
+    return results
@@ -0,0 +1,161 @@
+import math
+import numpy as np
+from hlt import constants, entity
+
+# dock points sit this far outside the planet's surface, well inside DOCK_RADIUS
+DOCK_POINT_DISTANCE = constants.DOCK_RADIUS / 2
+
+
+def slot_points(planet, distance=DOCK_POINT_DISTANCE):
+    """
+    Evenly spaced dock points around the planet, one per docking spot
+    return array of shape (num_docking_spots, 2)
+    """
+    angles = np.arange(planet.num_docking_spots) * (2 * math.pi / planet.num_docking_spots)
+    radius = planet.radius + distance
+    return np.column_stack((planet.x + radius * np.cos(angles), planet.y + radius * np.sin(angles)))
+
+
+class DockingSlots:
+    """
+    Allocates each planet's docking spots to incoming ships, so ships coming from the same
+    direction spread around the planet instead of piling up on the same point, and no more
+    ships try to dock in one turn than there are free spots.
+    """
+
+    def __init__(self):
+        # maps planet ids -> array of dock points
+        self._points = {}
+        # maps ship ids -> (planet id, slot index, turn last assigned)
+        self._assigned = {}
+        # maps planet ids -> boolean array of slots held by docked ships or assigned ships
+        self._taken = {}
+        # maps planet ids -> number of dock commands issued this turn
+        self._docking = {}
+        self._turn = 0
+
+    def build(self, game_map, deadline=None):
+        """
+        Precompute the dock points of every planet. Can be used as a warm-up hook.
+        """
+        for planet in game_map.all_planets():
+            self._points[planet.id] = slot_points(planet)
+
+    def start_turn(self, game_map):
+        """
+        Mark the slots held by docked ships and release the slots of ships that died, docked,
+        or were not sent to their planet last turn
+        """
+        self._turn += 1
+        self._docking = {}
+        self._taken = {}
+        for planet in game_map.all_planets():
+            if planet.id not in self._points:
+                self._points[planet.id] = slot_points(planet)
+            taken = np.zeros(len(self._points[planet.id]), dtype=bool)
+            docked = planet.all_docked_ships()
+            if docked:
+                positions = np.array([[ship.x, ship.y] for ship in docked])
+                taken[self._nearest_slots(planet.id, positions, taken)] = True
+            self._taken[planet.id] = taken
+
+        me = game_map.get_me()
+        for ship_id, (planet_id, slot, turn) in list(self._assigned.items()):
+            ship = me.get_ship(ship_id)
+            if (ship is None or ship.docking_status != ship.DockingStatus.UNDOCKED or
+                    planet_id not in self._taken or turn < self._turn - 1 or self._taken[planet_id][slot]):
+                del self._assigned[ship_id]
+            else:
+                self._taken[planet_id][slot] = True
+
+    def _nearest_slots(self, planet_id, positions, taken):
+        """
+        Greedily give each position its nearest slot that is still free
+        """
+        distances = np.linalg.norm(self._points[planet_id][np.newaxis, :, :] - positions[:, np.newaxis, :], axis=2)
+        distances[:, taken] = np.inf
+        slots = []
+        for row in distances:
+            slot = int(np.argmin(row))
+            if np.isinf(row[slot]):
+                break
+            slots.append(slot)
+            distances[:, slot] = np.inf
+        return slots
+
+    def assign(self, ship, planet):
+        """
+        Give the ship a dock point on the planet, keeping its previous one if it is still headed there
+        return the dock point as a Position, or None if all the planet's spots are taken
+        """
+        current = self._assigned.get(ship.id)
+        if current is not None and current[0] != planet.id:
+            self.release(ship)
+            current = None
+        if current is not None:
+            slot = current[1]
+        else:
+            if planet.id not in self._taken:
+                return None
+            slots = self._nearest_slots(planet.id, np.array([[ship.x, ship.y]]), self._taken[planet.id])
+            if not slots:
+                return None
+            slot = slots[0]
+            self._taken[planet.id][slot] = True
+        self._assigned[ship.id] = (planet.id, slot, self._turn)
+        return entity.Position(*self._points[planet.id][slot])
+
+    def release(self, ship):
+        """
+        Free the ship's slot, if it has one
+        """
+        current = self._assigned.pop(ship.id, None)
+        if current is not None and current[0] in self._taken:
+            self._taken[current[0]][current[1]] = False
+
+    def claim(self, ship, planet_id, slot):
+        """
+        Give the ship a slot chosen elsewhere (by another process's DockingSlots), unless another ship holds it
+        return True if the ship now holds the slot
+        """
+        current = self._assigned.get(ship.id)
+        if current is None or current[:2] != (planet_id, slot):
+            taken = self._taken.get(planet_id)
+            if taken is None or taken[slot]:
+                return False
+            self.release(ship)
+            taken[slot] = True
+        self._assigned[ship.id] = (planet_id, slot, self._turn)
+        return True
+
+    def assignments(self, ship_ids):
+        """
+        return the (planet id, slot index) assigned this turn to each of the given ships that has one
+        """
+        return {ship_id: self._assigned[ship_id][:2] for ship_id in ship_ids
+                if ship_id in self._assigned and self._assigned[ship_id][2] == self._turn}
+
+    def snapshot(self):
+        """
+        return the assignments and turn counter, to plan the next turn with in another process (see restore)
+        """
+        return dict(self._assigned), self._turn
+
+    def restore(self, snapshot):
+        """
+        Continue from a snapshot taken by another DockingSlots, before its next start_turn
+        """
+        assigned, self._turn = snapshot
+        self._assigned = dict(assigned)
+
+    def try_dock(self, ship, planet):
+        """
+        Record a dock command for this turn if the planet still has a free spot for it
+        return True if the ship should dock
+        """
+        issued = self._docking.get(planet.id, 0)
+        if issued >= planet.num_docking_spots - len(planet._docked_ship_ids):
+            return False
+        self._docking[planet.id] = issued + 1
+        self.release(ship)
+        return True
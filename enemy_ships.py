@@ -1,5 +1,6 @@
 import numpy as np
-import scipy.spatial.distance
+import hlt
+from hlt import arrays
 
 def extract_positions(ships):
     """
@@ -22,21 +23,31 @@ def check_enemy_distances(myships, all_ships, threshold=6):
     not_docked = [ship for ship in myships if ship.docking_status == ship.DockingStatus.UNDOCKED]
     not_mine = [ship for ship in all_ships if ship.owner != my_id]
 
-    my_positions = extract_positions(not_docked)
-    their_positions = extract_positions(not_mine)
+    # loop, distance table or KD-tree, whichever is fastest for this many ships
+    in_range = hlt.distances.within(not_docked, not_mine, threshold)
 
-    #import pdb; pdb.set_trace()
-    #print("** their_positions:", their_positions)
-    #print("** my_positions:", my_positions)
+    results = {}
+    for (ship, theirs_in_range) in zip(not_docked, in_range):
+        results[ship] = theirs_in_range
 
-    distances = scipy.spatial.distance.cdist(my_positions, their_positions)
+    return results
+
+def check_map_enemy_distances(myships, game_map, threshold=6):
+    """
+    Find out if any enemy ships of the map are in range of my ships, like check_enemy_distances,
+    from the map's ship rows and distance table: only the enemy ships in range are built
+    return dict of my ships to list of enemy ships in threshold range
+    """
+    not_docked = [ship for ship in myships if ship.docking_status == ship.DockingStatus.UNDOCKED]
+    if not not_docked:
+        return {}
+    table = game_map.distances
+    ships, _ = game_map.frame_rows()
+    in_range = table.ship_distances()[[ship._table_row for ship in not_docked]] <= threshold
+    in_range &= ships[:, arrays.SHIP_OWNER] != game_map.my_id
 
     results = {}
-    for (row, ship) in enumerate(not_docked):
-        theirs_in_range = [
-            not_mine[col]
-            for col in range(len(not_mine))
-            if distances[row, col] <= threshold]
-        results[ship] = theirs_in_range
+    for (ship, row) in zip(not_docked, in_range):
+        results[ship] = [table.entity(table.num_planets() + col) for col in np.flatnonzero(row).tolist()]
 
     return results
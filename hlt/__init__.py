@@ -6,6 +6,7 @@ the start, then in a loop, call get_map() to get the current game state, then
 build up a list of commands and send them with send_command_queue().
 """
 
-from . import collision, constants, entity, game_map, networking
+from . import (arrays, collision, constants, distances, engine, entity, game_map, geometry, history, navigation,
+               networking, recorder, selection, warmup)
 
 from .networking import Game
@@ -0,0 +1,187 @@
+"""
+Numeric snapshots of the map.
+
+Every ship and planet can be flattened into one row of a float64 array, with the
+columns in the order the Halite engine sends them. These arrays are cheap to copy
+between processes and to store, and a map can be rebuilt from them without
+re-parsing the engine's text.
+"""
+import numpy as np
+
+from . import entity
+
+# ship columns, in wire order with the owner prepended
+(SHIP_OWNER, SHIP_ID, SHIP_X, SHIP_Y, SHIP_HEALTH, SHIP_VEL_X, SHIP_VEL_Y,
+ SHIP_DOCKING_STATUS, SHIP_PLANET, SHIP_PROGRESS, SHIP_COOLDOWN) = range(11)
+SHIP_COLUMNS = 11
+
+# planet columns, in wire order (docked ship ids are recovered from the ships)
+(PLANET_ID, PLANET_X, PLANET_Y, PLANET_HEALTH, PLANET_RADIUS, PLANET_DOCKING_SPOTS,
+ PLANET_CURRENT, PLANET_REMAINING, PLANET_OWNED, PLANET_OWNER, PLANET_NUM_DOCKED) = range(11)
+PLANET_COLUMNS = 11
+
+#: Value stored for "no owner" / "no planet"
+NONE = -1
+
+
+def _id_of(value):
+    """
+    Owners and planets are ids before Map._link and objects after it.
+    """
+    if value is None:
+        return NONE
+    return getattr(value, 'id', value)
+
+
+def ships_to_array(ships, out=None):
+    """
+    Flatten ships into an array with SHIP_COLUMNS columns.
+
+    :param list[entity.Ship] ships: The ships to flatten
+    :param np.ndarray out: Optional preallocated array with at least len(ships) rows
+    :return: The filled rows
+    :rtype: np.ndarray
+    """
+    if out is None:
+        out = np.empty((len(ships), SHIP_COLUMNS))
+    rows = out[:len(ships)]
+    for row, ship in zip(rows, ships):
+        row[:] = (_id_of(ship.owner), ship.id, ship.x, ship.y, ship.health,
+                  ship.vel_x, ship.vel_y,
+                  ship.docking_status.value, _id_of(ship.planet),
+                  ship._docking_progress, ship._weapon_cooldown)
+    return rows
+
+
+def planets_to_array(planets, out=None):
+    """
+    Flatten planets into an array with PLANET_COLUMNS columns.
+
+    :param list[entity.Planet] planets: The planets to flatten
+    :param np.ndarray out: Optional preallocated array with at least len(planets) rows
+    :return: The filled rows
+    :rtype: np.ndarray
+    """
+    if out is None:
+        out = np.empty((len(planets), PLANET_COLUMNS))
+    rows = out[:len(planets)]
+    for row, planet in zip(rows, planets):
+        owner = _id_of(planet.owner)
+        row[:] = (planet.id, planet.x, planet.y, planet.health, planet.radius,
+                  planet.num_docking_spots, planet.current_production,
+                  planet.remaining_resources, int(owner != NONE), owner,
+                  len(planet._docked_ship_ids))
+    return rows
+
+
+def frame_to_arrays(map_string):
+    """
+    Convert the engine's frame straight into ship and planet rows, in one pass over the tokens
+    and without building any objects.
+
+    :param str map_string: The frame, as sent by the Halite engine
+    :return: The ship rows, the planet rows and the player ids, in frame order
+    :rtype: (np.ndarray, np.ndarray, list[int])
+    """
+    tokens = map_string.split()
+    position = 1
+    player_ids, blocks = [], []
+    for _ in range(int(tokens[0])):
+        player_id, num_ships = int(tokens[position]), int(tokens[position + 1])
+        position += 2
+        block = np.empty((num_ships, SHIP_COLUMNS))
+        block[:, SHIP_OWNER] = player_id
+        block[:, SHIP_ID:] = np.array(tokens[position:position + 10 * num_ships], dtype=float).reshape(num_ships, 10)
+        position += 10 * num_ships
+        player_ids.append(player_id)
+        blocks.append(block)
+    ships = np.concatenate(blocks) if blocks else np.empty((0, SHIP_COLUMNS))
+    ships[ships[:, SHIP_DOCKING_STATUS] == entity.Ship.DockingStatus.UNDOCKED.value, SHIP_PLANET] = NONE
+
+    num_planets = int(tokens[position])
+    position += 1
+    planets = np.empty((num_planets, PLANET_COLUMNS))
+    for row in range(num_planets):
+        planets[row] = tokens[position:position + PLANET_COLUMNS]
+        # skip the docked ship ids, they are recovered from the ships
+        position += PLANET_COLUMNS + int(tokens[position + PLANET_NUM_DOCKED])
+    assert position == len(tokens)  # There should be no remaining tokens at this point
+    planets[planets[:, PLANET_OWNED] == 0, PLANET_OWNER] = NONE
+    return ships, planets, player_ids
+
+
+def ship_from_row(row):
+    """
+    Build one ship object.
+
+    :param list[float] row: A ship row, as a list
+    :return: The ship, with ids not yet linked to objects
+    :rtype: entity.Ship
+    """
+    return entity.Ship(
+        int(row[SHIP_OWNER]), int(row[SHIP_ID]), row[SHIP_X], row[SHIP_Y], int(row[SHIP_HEALTH]),
+        row[SHIP_VEL_X], row[SHIP_VEL_Y],
+        entity.Ship.DockingStatus(int(row[SHIP_DOCKING_STATUS])),
+        int(row[SHIP_PLANET]), int(row[SHIP_PROGRESS]), int(row[SHIP_COOLDOWN]))
+
+
+def planet_from_row(row, docked_ship_ids):
+    """
+    Build one planet object.
+
+    :param list[float] row: A planet row, as a list
+    :param list[int] docked_ship_ids: Ids of the ships docked to it
+    :return: The planet, with ids not yet linked to objects
+    :rtype: entity.Planet
+    """
+    return entity.Planet(
+        int(row[PLANET_ID]), row[PLANET_X], row[PLANET_Y], int(row[PLANET_HEALTH]), row[PLANET_RADIUS],
+        int(row[PLANET_DOCKING_SPOTS]), int(row[PLANET_CURRENT]), int(row[PLANET_REMAINING]),
+        bool(row[PLANET_OWNED]), int(row[PLANET_OWNER]), docked_ship_ids)
+
+
+def docked_ship_ids(ship_rows):
+    """
+    :param np.ndarray ship_rows: Ship rows
+    :return: Ids of the ships docked (or docking, undocking) to each planet, keyed by planet id
+    :rtype: dict[int, list[int]]
+    """
+    docked = ship_rows[:, SHIP_DOCKING_STATUS] != entity.Ship.DockingStatus.UNDOCKED.value
+    docked_by_planet = {}
+    for plid, sid in zip(ship_rows[docked, SHIP_PLANET].astype(int).tolist(),
+                         ship_rows[docked, SHIP_ID].astype(int).tolist()):
+        docked_by_planet.setdefault(plid, []).append(sid)
+    return docked_by_planet
+
+
+def ships_from_array(rows):
+    """
+    Build ship objects from flattened rows.
+
+    :param np.ndarray rows: Ship rows
+    :return: Ships keyed by owner, then by ship id
+    :rtype: dict[int, dict[int, entity.Ship]]
+    """
+    ships = {}
+    for row in rows.tolist():
+        ship = ship_from_row(row)
+        ships.setdefault(ship.owner, {})[ship.id] = ship
+    return ships
+
+
+def planets_from_array(rows, ship_rows):
+    """
+    Build planet objects from flattened rows. Docked ship ids are taken from the ships
+    whose planet column points at the planet.
+
+    :param np.ndarray rows: Planet rows
+    :param np.ndarray ship_rows: Ship rows
+    :return: Planets keyed by id
+    :rtype: dict[int, entity.Planet]
+    """
+    docked_by_planet = docked_ship_ids(ship_rows)
+    planets = {}
+    for row in rows.tolist():
+        plid = int(row[PLANET_ID])
+        planets[plid] = planet_from_row(row, docked_by_planet.get(plid, []))
+    return planets
@@ -1,9 +1,78 @@
 from .entity import Position, Entity
+import numpy as np
 
 def intersect_segments_circles(segments, circles, *, fudge=0.5):
     """
-    calculate the intersection of segments with circles
+    calculate the intersection of segments with circles, for every pair at once.
+    Same test as intersect_segment_circle.
+
+    :param np.ndarray segments: N x 4 array of start x, start y, end x, end y
+    :param np.ndarray circles: M x 3 array of x, y, radius
+    :param float fudge: Additional distance to leave between the segments and circles
+    :return: N x M boolean array, True where the segment intersects the circle
+    :rtype: np.ndarray
+    """
+    segments = np.asarray(segments, dtype=float)
+    circles = np.asarray(circles, dtype=float)
+    start = segments[:, np.newaxis, 0:2]
+    delta = segments[:, np.newaxis, 2:4] - start
+    offset = circles[np.newaxis, :, 0:2] - start
+
+    a = (delta ** 2).sum(axis=2)
+    projection = (delta * offset).sum(axis=2)
+    # a == 0 means start and end are the same point, which is its own closest point
+    t = np.minimum(np.divide(projection, a, out=np.zeros_like(projection), where=a != 0), 1.0)
+
+    closest = delta * t[:, :, np.newaxis] - offset
+    reach = circles[np.newaxis, :, 2] + fudge
+    return (t >= 0) & ((closest ** 2).sum(axis=2) <= reach ** 2)
+
+
+def closest_approach(positions_a, velocities_a, positions_b, velocities_b, *, horizon=1.0):
+    """
+    For every pair of moving points from a and b, find when during [0, horizon] they
+    are closest, assuming constant velocity.
+
+    :param np.ndarray positions_a: N x 2 array of positions
+    :param np.ndarray velocities_a: N x 2 array of velocities (distance per turn)
+    :param np.ndarray positions_b: M x 2 array of positions
+    :param np.ndarray velocities_b: M x 2 array of velocities (distance per turn)
+    :param float horizon: The number of turns to look ahead
+    :return: N x M arrays of the time of closest approach and the distance at that time
+    :rtype: (np.ndarray, np.ndarray)
+    """
+    offset = (np.asarray(positions_b, dtype=float)[np.newaxis, :, :] -
+              np.asarray(positions_a, dtype=float)[:, np.newaxis, :])
+    relative_velocity = (np.asarray(velocities_b, dtype=float)[np.newaxis, :, :] -
+                         np.asarray(velocities_a, dtype=float)[:, np.newaxis, :])
+
+    speed_squared = (relative_velocity ** 2).sum(axis=2)
+    closing = -(offset * relative_velocity).sum(axis=2)
+    t = np.divide(closing, speed_squared, out=np.zeros_like(closing), where=speed_squared != 0)
+    t = np.clip(t, 0.0, horizon)
+
+    closest = offset + relative_velocity * t[:, :, np.newaxis]
+    return t, np.sqrt((closest ** 2).sum(axis=2))
+
+
+def swept_collisions(positions_a, velocities_a, radii_a, positions_b, velocities_b, radii_b, *,
+                     fudge=0.0, horizon=1.0):
+    """
+    Continuous collision test between two sets of moving circles: unlike a test against
+    a snapshot, this catches circles that pass through each other during the turn.
+
+    :param radii_a: Radius per circle of a (N array or scalar)
+    :param radii_b: Radius per circle of b (M array or scalar)
+    :param float fudge: Additional distance to leave between circles
+    :return: N x M boolean array of collisions, and N x M array of the time of closest approach
+    :rtype: (np.ndarray, np.ndarray)
+
+    See closest_approach for the other parameters.
     """
+    t, distance = closest_approach(positions_a, velocities_a, positions_b, velocities_b, horizon=horizon)
+    reach = (np.asarray(radii_a, dtype=float).reshape(-1, 1) +
+             np.asarray(radii_b, dtype=float).reshape(1, -1) + fudge)
+    return distance <= reach, t
 
 
 def intersect_segment_circle(start, end, circle, *, fudge=0.5):
@@ -22,3 +22,9 @@ DOCK_TURNS = 5
 BASE_PRODUCTIVITY = 6
 #: Distance from the planets edge at which new ships are created
 SPAWN_RADIUS = 2.0
+#: Production a planet needs to create a ship (each fully docked ship adds BASE_PRODUCTIVITY per turn)
+PRODUCTION_PER_SHIP = 72
+#: Seconds the engine allows bots to initialize
+INIT_TIME_LIMIT = 60.0
+#: Seconds of the initialization allowance the warm-up may use, leaving room for start-up
+WARM_UP_BUDGET = 30.0
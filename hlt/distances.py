@@ -0,0 +1,279 @@
+"""
+Per-turn shared distances and angles between the entities of a map.
+
+:class:`DistanceTable` holds the ships x planets and ships x ships blocks of distances and
+angles for one parsed map. Each block is computed on first use with one vectorized call, and
+each of its rows is converted to a list the first time it is looked up, so scalar lookups are
+list indexing without turning whole blocks into Python objects. The map builds a new table
+every time it is parsed, and the entities it links point to it, so :meth:`entity.Entity.calculate_distance_between` and friends
+answer from the table. Entities that are not in the map (e.g. :class:`entity.Position`) are
+computed directly as before; an entity moved after parsing must be dropped from the table by
+setting its ``distance_table`` to None. A lazily parsed map passes its ship and planet rows
+instead, and its entities :meth:`DistanceTable.register` as they are built.
+"""
+import numpy as np
+import scipy.spatial
+
+from . import arrays, constants, selection
+from .entity import Planet
+
+
+def _distance_block(sources, targets):
+    offset = targets[np.newaxis, :, :] - sources[:, np.newaxis, :]
+    return np.sqrt((offset ** 2).sum(axis=2))
+
+
+def _angle_block(sources, targets):
+    offset = targets[np.newaxis, :, :] - sources[:, np.newaxis, :]
+    return np.degrees(np.arctan2(offset[:, :, 1], offset[:, :, 0])) % 360
+
+
+class DistanceTable:
+    """
+    Lazily computed distances and angles between the ships and planets of one turn.
+    """
+
+    def __init__(self, ships, planets, ship_rows=None, planet_rows=None, selector=None):
+        """
+        :param ships: All ships of the map, a list or a sequence building them on access
+        :param planets: All planets of the map, a list or a sequence building them on access
+        :param np.ndarray ship_rows: The map's ship rows (see :mod:`hlt.arrays`), in the order of ships.
+            When given, the entities are not touched until looked up and must register themselves
+        :param np.ndarray planet_rows: The map's planet rows, in the order of planets
+        :param selection.AlgorithmSelector selector: The map's selector, for queries on the table's entities
+        """
+        self._ships = ships
+        self._planets = planets
+        self._ship_rows = ship_rows
+        self._planet_rows = planet_rows
+        self.selector = selector
+        if ship_rows is None:
+            for table_row, celestial_object in enumerate(ships):
+                self.register(celestial_object, table_row)
+            for table_row, celestial_object in enumerate(planets):
+                self.register(celestial_object, table_row)
+        self._ship_positions = None
+        self._planet_positions = None
+        self._blocks = {}
+        # maps (kind, target is a planet, source row) -> that row of the block as a list
+        self._rows = {}
+        self._circles = None
+        self._tree = None
+        self._velocities = None
+
+    def register(self, celestial_object, table_row):
+        """
+        Point an entity of the map at the table.
+
+        :param entity.Entity celestial_object: A ship or planet of the map
+        :param int table_row: Its index among the map's ships or planets
+        :return: nothing
+        """
+        celestial_object.distance_table, celestial_object._table_row = self, table_row
+        celestial_object._table_planet = isinstance(celestial_object, Planet)
+
+    def _positions(self):
+        if self._ship_positions is None and self._ship_rows is not None:
+            self._ship_positions = self._ship_rows[:, [arrays.SHIP_X, arrays.SHIP_Y]]
+            self._planet_positions = self._planet_rows[:, [arrays.PLANET_X, arrays.PLANET_Y]]
+        elif self._ship_positions is None:
+            self._ship_positions = np.array([(ship.x, ship.y) for ship in self._ships], dtype=float).reshape(-1, 2)
+            self._planet_positions = np.array(
+                [(planet.x, planet.y) for planet in self._planets], dtype=float).reshape(-1, 2)
+        return self._ship_positions, self._planet_positions
+
+    def entity(self, n):
+        """
+        :param int n: A row of :meth:`circles` and :meth:`tree`
+        :return: The entity of that row: the planets come first, then the ships
+        :rtype: entity.Entity
+        """
+        num_planets = len(self._planets)
+        return self._planets[n] if n < num_planets else self._ships[n - num_planets]
+
+    def num_planets(self):
+        """
+        :return: The number of planets, which come first in the rows
+        :rtype: int
+        """
+        return len(self._planets)
+
+    def num_entities(self):
+        """
+        :return: The number of planets and ships
+        :rtype: int
+        """
+        return len(self._planets) + len(self._ships)
+
+    def circles(self):
+        """
+        :return: N x 3 array of the x, y and radius of the planets then the ships
+        :rtype: np.ndarray
+        """
+        if self._circles is None and self._ship_rows is not None:
+            ships, planets = self._positions()
+            self._circles = np.vstack([
+                np.column_stack([planets, self._planet_rows[:, arrays.PLANET_RADIUS]]),
+                np.column_stack([ships, np.full(len(ships), constants.SHIP_RADIUS)])])
+        elif self._circles is None:
+            self._circles = np.array([(celestial_object.x, celestial_object.y, celestial_object.radius)
+                                      for celestial_object in self._planets + self._ships],
+                                     dtype=float).reshape(-1, 3)
+        return self._circles
+
+    def tree(self):
+        """
+        :return: A KD-tree of the centres of :meth:`circles`
+        :rtype: scipy.spatial.cKDTree
+        """
+        if self._tree is None:
+            self._tree = scipy.spatial.cKDTree(self.circles()[:, 0:2])
+        return self._tree
+
+    def ship_velocities(self):
+        """
+        :return: Ships x 2 array of velocities, in the order of the map's all_ships
+        :rtype: np.ndarray
+        """
+        if self._velocities is None and self._ship_rows is not None:
+            self._velocities = self._ship_rows[:, [arrays.SHIP_VEL_X, arrays.SHIP_VEL_Y]]
+        elif self._velocities is None:
+            self._velocities = np.array([(ship.vel_x, ship.vel_y) for ship in self._ships],
+                                        dtype=float).reshape(-1, 2)
+        return self._velocities
+
+    def _block(self, name):
+        """
+        :param str name: One of ship_planet_distances, ship_ship_distances, ship_planet_angles, ship_ship_angles
+        :return: The block, computed on first use
+        :rtype: np.ndarray
+        """
+        block = self._blocks.get(name)
+        if block is None:
+            ships, planets = self._positions()
+            compute = _distance_block if name.endswith('distances') else _angle_block
+            block = self._blocks[name] = compute(ships, planets if name.startswith('ship_planet') else ships)
+        return block
+
+    def ship_planet_distances(self):
+        """
+        :return: Ships x planets distances, rows and columns in the order of the map's all_ships and all_planets
+        :rtype: np.ndarray
+        """
+        return self._block('ship_planet_distances')
+
+    def ship_distances(self):
+        """
+        :return: Ships x ships distances, in the order of the map's all_ships
+        :rtype: np.ndarray
+        """
+        return self._block('ship_ship_distances')
+
+    def _lookup(self, kind, source, target):
+        """
+        :return: The value from a ship source to a target of the table, from the blocks of the given kind
+        """
+        key = (kind, target._table_planet, source._table_row)
+        row = self._rows.get(key)
+        if row is None:
+            row = self._rows[key] = self._block(
+                ('ship_planet_' if target._table_planet else 'ship_ship_') + kind)[source._table_row].tolist()
+        return row[target._table_row]
+
+    def distance(self, source, target):
+        """
+        :param entity.Entity source: A ship of the map
+        :param entity.Entity target: A ship or planet of the map
+        :return: The distance between their centres, or None if the pair is not in the table
+        :rtype: float
+        """
+        if target.distance_table is not self:
+            return None
+        if source._table_planet:
+            if target._table_planet:
+                return None
+            # distances are symmetric
+            source, target = target, source
+        return self._lookup('distances', source, target)
+
+    def angle(self, source, target):
+        """
+        :param entity.Entity source: A ship of the map
+        :param entity.Entity target: A ship or planet of the map
+        :return: The angle from source to target in degrees, or None if the pair is not in the table
+        :rtype: float
+        """
+        if target.distance_table is not self or source._table_planet:
+            return None
+        return self._lookup('angles', source, target)
+
+    def pairwise(self, sources, targets):
+        """
+        :param list[entity.Ship] sources: Ships of the map
+        :param list[entity.Entity] targets: Ships of the map, or planets of the map
+        :return: Sources x targets distances taken from the table, or None if any of them is not in it
+        :rtype: np.ndarray
+        """
+        if not all(source.distance_table is self and not source._table_planet for source in sources):
+            return None
+        rows = [source._table_row for source in sources]
+        # whole rows when the targets are all the map's ships or planets, in order
+        if isinstance(self._ships, list) and targets == self._ships:
+            return self.ship_distances()[rows]
+        if isinstance(self._planets, list) and targets == self._planets:
+            return self.ship_planet_distances()[rows]
+        if all(target.distance_table is self and not target._table_planet for target in targets):
+            block = self.ship_distances()
+        elif all(target.distance_table is self and target._table_planet for target in targets):
+            block = self.ship_planet_distances()
+        else:
+            return None
+        return block[np.ix_(rows, [target._table_row for target in targets])]
+
+def pairwise(sources, targets):
+    """
+    Distances between every source and every target entity, from their map's distance table when
+    they all share one, computed otherwise.
+
+    :param list[entity.Entity] sources: N entities
+    :param list[entity.Entity] targets: M entities
+    :return: N x M array of distances
+    :rtype: np.ndarray
+    """
+    table = sources[0].distance_table if len(sources) else None
+    distances = table.pairwise(sources, targets) if table is not None else None
+    if distances is None:
+        distances = _distance_block(
+            np.array([(source.x, source.y) for source in sources], dtype=float).reshape(-1, 2),
+            np.array([(target.x, target.y) for target in targets], dtype=float).reshape(-1, 2))
+    return distances
+
+
+def within(sources, targets, threshold, algorithm=None):
+    """
+    For every source, the targets whose centre is within threshold of the source's centre.
+
+    :param list[entity.Entity] sources: N entities
+    :param list[entity.Entity] targets: M entities
+    :param float threshold: Greatest distance
+    :param str algorithm: 'loop', 'vectorized' or 'kdtree', by default the fastest for the
+        number of entities according to the sources' map (see :mod:`hlt.selection`)
+    :return: For each source, the list of targets in range, in the order of targets
+    :rtype: list[list[entity.Entity]]
+    """
+    if not len(sources) or not len(targets):
+        return [[] for _ in sources]
+    if algorithm is None:
+        table = sources[0].distance_table
+        count = len(sources) + len(targets)
+        selector = table.selector if table is not None else None
+        algorithm = selector.choose('proximity', count) if selector is not None else selection.default_choice(count)
+    if algorithm == 'loop':
+        return [[target for target in targets if source.calculate_distance_between(target) <= threshold]
+                for source in sources]
+    if algorithm == 'vectorized':
+        close = pairwise(sources, targets) <= threshold
+        return [[targets[col] for col in np.flatnonzero(row).tolist()] for row in close]
+    tree = scipy.spatial.cKDTree([(target.x, target.y) for target in targets])
+    return [[targets[col] for col in sorted(cols)]
+            for cols in tree.query_ball_point([(source.x, source.y) for source in sources], threshold)]
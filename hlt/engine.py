@@ -0,0 +1,291 @@
+"""
+In-process stand-in for the Halite engine.
+
+:class:`LocalEngine` speaks the engine's line protocol to a :class:`networking.Game` through
+a transport object instead of pipes, so whole games can run inside one Python process for
+tests, benchmarks and profiling. Frames either replay scripted ship and planet arrays (e.g.
+from :mod:`hlt.recorder`) or come from a small simulation of movement, docking and
+production. There is no combat and no collision.
+"""
+import math
+import re
+
+import numpy as np
+
+from . import arrays, constants, game_map
+from .entity import Ship
+from .networking import GameOver
+
+_COMMAND_TOKEN = re.compile(r'[tdu]|-?\d+')
+# number of integer arguments of each command
+_ARGUMENTS = {'t': 3, 'd': 2, 'u': 1}
+
+
+def format_frame(ships, planets, player_ids):
+    """
+    Write ship and planet arrays in the engine's frame format.
+
+    :param np.ndarray ships: Ship rows
+    :param np.ndarray planets: Planet rows
+    :param player_ids: All player ids, including those without ships
+    :return: The frame, as the engine would send it
+    :rtype: str
+    """
+    tokens = [str(len(player_ids))]
+    for player_id in sorted(player_ids):
+        owned = ships[ships[:, arrays.SHIP_OWNER] == player_id]
+        tokens.append("{} {}".format(player_id, len(owned)))
+        for row in owned.tolist():
+            tokens.append("{:d} {:.4f} {:.4f} {:d} {:.4f} {:.4f} {:d} {:d} {:d} {:d}".format(
+                int(row[arrays.SHIP_ID]), row[arrays.SHIP_X], row[arrays.SHIP_Y], int(row[arrays.SHIP_HEALTH]),
+                row[arrays.SHIP_VEL_X], row[arrays.SHIP_VEL_Y], int(row[arrays.SHIP_DOCKING_STATUS]),
+                max(int(row[arrays.SHIP_PLANET]), 0), int(row[arrays.SHIP_PROGRESS]),
+                int(row[arrays.SHIP_COOLDOWN])))
+
+    docked = ships[ships[:, arrays.SHIP_DOCKING_STATUS] != Ship.DockingStatus.UNDOCKED.value]
+    tokens.append(str(len(planets)))
+    for row in planets.tolist():
+        docked_ids = docked[docked[:, arrays.SHIP_PLANET] == row[arrays.PLANET_ID], arrays.SHIP_ID].astype(int)
+        tokens.append("{:d} {:.4f} {:.4f} {:d} {:.4f} {:d} {:d} {:d} {:d} {:d} {:d}".format(
+            int(row[arrays.PLANET_ID]), row[arrays.PLANET_X], row[arrays.PLANET_Y], int(row[arrays.PLANET_HEALTH]),
+            row[arrays.PLANET_RADIUS], int(row[arrays.PLANET_DOCKING_SPOTS]), int(row[arrays.PLANET_CURRENT]),
+            int(row[arrays.PLANET_REMAINING]), int(row[arrays.PLANET_OWNED]), max(int(row[arrays.PLANET_OWNER]), 0),
+            len(docked_ids)))
+        tokens.extend(str(ship_id) for ship_id in docked_ids.tolist())
+    return ' '.join(tokens)
+
+
+def parse_commands(text):
+    """
+    Split a bot's command line into commands. Bots send commands back to back, so tokens are
+    matched rather than split on whitespace.
+
+    :param str text: Everything the bot sent before the newline
+    :return: The commands as (kind, *integer arguments) tuples
+    :rtype: list[tuple]
+    """
+    tokens = _COMMAND_TOKEN.findall(text)
+    commands = []
+    position = 0
+    while position < len(tokens):
+        kind = tokens[position]
+        count = _ARGUMENTS[kind]
+        commands.append((kind,) + tuple(int(token) for token in tokens[position + 1:position + 1 + count]))
+        position += count + 1
+    return commands
+
+
+class LocalEngine:
+    """
+    :ivar ships: Current ship rows
+    :ivar planets: Current planet rows
+    :ivar turn: The turn of the last frame sent, the initial frame being 0
+    :ivar command_queues: The commands received each turn, as sent
+    """
+
+    def __init__(self, my_id, width, height, ships, planets, player_ids=None, max_turns=300, frames=None):
+        """
+        :param int my_id: The player id of the bot being run
+        :param int width: Map width
+        :param int height: Map height
+        :param np.ndarray ships: Initial ship rows
+        :param np.ndarray planets: Initial planet rows
+        :param player_ids: All player ids (by default the owners of the ships)
+        :param int max_turns: Number of turns played after the initial frame
+        :param frames: (ships, planets) arrays to replay each turn instead of simulating
+        """
+        self.my_id = my_id
+        self.width = width
+        self.height = height
+        self.ships = np.array(ships, dtype=float)
+        self.planets = np.array(planets, dtype=float)
+        self.player_ids = sorted(set(self.ships[:, arrays.SHIP_OWNER].astype(int).tolist()) | {my_id}
+                                 if player_ids is None else player_ids)
+        self.max_turns = max_turns if frames is None else min(max_turns, len(frames) - 1)
+        self.turn = 0
+        self.command_queues = []
+        self._frames = frames
+
+    @classmethod
+    def from_frame(cls, frame, my_id, width, height, **kwargs):
+        """
+        Start from a frame in the engine's text format.
+        """
+        initial = game_map.Map(my_id, width, height)
+        initial._parse(frame)
+        return cls(my_id, width, height, initial.ship_array(), initial.planet_array(),
+                   [player.id for player in initial.all_players()], **kwargs)
+
+    @classmethod
+    def from_recording(cls, recording, **kwargs):
+        """
+        Replay the frames of a :func:`recorder.load` recording.
+        """
+        frames = [(turn.ships, turn.planets) for turn in recording.turns]
+        return cls(recording.my_id, recording.width, recording.height, frames[0][0], frames[0][1],
+                   frames=frames, **kwargs)
+
+    def transport(self):
+        """
+        :return: A transport to pass to :class:`networking.Game`
+        :rtype: EngineTransport
+        """
+        return EngineTransport(self)
+
+    def frame(self):
+        """
+        :return: The current state in the engine's frame format
+        :rtype: str
+        """
+        return format_frame(self.ships, self.planets, self.player_ids)
+
+    def next_frame(self):
+        """
+        Start the next turn.
+
+        :return: The turn's frame
+        :rtype: str
+        """
+        self.turn += 1
+        if self._frames is not None:
+            self.ships = np.array(self._frames[self.turn][0])
+            self.planets = np.array(self._frames[self.turn][1])
+        return self.frame()
+
+    @property
+    def finished(self):
+        return self.turn >= self.max_turns
+
+    def step(self, command_queue):
+        """
+        Apply the bot's commands for the current turn.
+
+        :param str command_queue: Everything the bot sent this turn
+        :return: nothing
+        """
+        self.command_queues.append(command_queue)
+        if self._frames is not None:
+            return
+        self._apply(parse_commands(command_queue))
+        self._advance_docking()
+        self._produce()
+
+    def _rows_by_id(self, table, column):
+        return {int(key): row for (row, key) in enumerate(table[:, column].tolist())}
+
+    def _apply(self, commands):
+        ships = self._rows_by_id(self.ships, arrays.SHIP_ID)
+        planets = self._rows_by_id(self.planets, arrays.PLANET_ID)
+        undocked = Ship.DockingStatus.UNDOCKED.value
+        for kind, ship_id, *params in commands:
+            row = ships.get(ship_id)
+            if row is None or self.ships[row, arrays.SHIP_OWNER] != self.my_id:
+                continue
+            ship = self.ships[row]
+            if kind == 't' and ship[arrays.SHIP_DOCKING_STATUS] == undocked:
+                speed, angle = min(params[0], constants.MAX_SPEED), math.radians(params[1])
+                ship[arrays.SHIP_X] = np.clip(ship[arrays.SHIP_X] + speed * math.cos(angle), 0, self.width)
+                ship[arrays.SHIP_Y] = np.clip(ship[arrays.SHIP_Y] + speed * math.sin(angle), 0, self.height)
+            elif kind == 'd' and ship[arrays.SHIP_DOCKING_STATUS] == undocked and params[0] in planets:
+                planet = self.planets[planets[params[0]]]
+                distance = math.hypot(planet[arrays.PLANET_X] - ship[arrays.SHIP_X],
+                                      planet[arrays.PLANET_Y] - ship[arrays.SHIP_Y])
+                free = planet[arrays.PLANET_DOCKING_SPOTS] - planet[arrays.PLANET_NUM_DOCKED]
+                theirs = planet[arrays.PLANET_OWNED] and planet[arrays.PLANET_OWNER] != self.my_id
+                if distance <= planet[arrays.PLANET_RADIUS] + constants.DOCK_RADIUS + constants.SHIP_RADIUS \
+                        and free > 0 and not theirs:
+                    ship[arrays.SHIP_DOCKING_STATUS] = Ship.DockingStatus.DOCKING.value
+                    ship[arrays.SHIP_PLANET] = params[0]
+                    ship[arrays.SHIP_PROGRESS] = constants.DOCK_TURNS
+                    planet[arrays.PLANET_NUM_DOCKED] += 1
+                    planet[arrays.PLANET_OWNED], planet[arrays.PLANET_OWNER] = 1, self.my_id
+            elif kind == 'u' and ship[arrays.SHIP_DOCKING_STATUS] == Ship.DockingStatus.DOCKED.value:
+                ship[arrays.SHIP_DOCKING_STATUS] = Ship.DockingStatus.UNDOCKING.value
+                ship[arrays.SHIP_PROGRESS] = constants.DOCK_TURNS
+
+    def _advance_docking(self):
+        status = self.ships[:, arrays.SHIP_DOCKING_STATUS]
+        progress = self.ships[:, arrays.SHIP_PROGRESS]
+        moving = (status == Ship.DockingStatus.DOCKING.value) | (status == Ship.DockingStatus.UNDOCKING.value)
+        progress[moving] -= 1
+        done = moving & (progress <= 0)
+        docked = done & (status == Ship.DockingStatus.DOCKING.value)
+        undocked = done & (status == Ship.DockingStatus.UNDOCKING.value)
+        status[docked] = Ship.DockingStatus.DOCKED.value
+        status[undocked] = Ship.DockingStatus.UNDOCKED.value
+        self.ships[undocked, arrays.SHIP_PLANET] = arrays.NONE
+
+        # planets lose their owner once nobody is docked
+        attached = self.ships[status != Ship.DockingStatus.UNDOCKED.value, arrays.SHIP_PLANET]
+        counts = np.array([np.count_nonzero(attached == planet_id)
+                           for planet_id in self.planets[:, arrays.PLANET_ID].tolist()])
+        self.planets[:, arrays.PLANET_NUM_DOCKED] = counts
+        self.planets[counts == 0, arrays.PLANET_OWNED] = 0
+        self.planets[counts == 0, arrays.PLANET_OWNER] = arrays.NONE
+
+    def _produce(self):
+        docked = self.ships[self.ships[:, arrays.SHIP_DOCKING_STATUS] == Ship.DockingStatus.DOCKED.value]
+        next_id = int(self.ships[:, arrays.SHIP_ID].max(initial=-1)) + 1
+        spawned = []
+        for planet in self.planets:
+            producers = np.count_nonzero(docked[:, arrays.SHIP_PLANET] == planet[arrays.PLANET_ID])
+            planet[arrays.PLANET_CURRENT] += producers * constants.BASE_PRODUCTIVITY
+            if planet[arrays.PLANET_CURRENT] < constants.PRODUCTION_PER_SHIP:
+                continue
+            planet[arrays.PLANET_CURRENT] -= constants.PRODUCTION_PER_SHIP
+            # spawn off the planet's surface, facing the map centre
+            angle = math.atan2(self.height / 2 - planet[arrays.PLANET_Y], self.width / 2 - planet[arrays.PLANET_X])
+            distance = planet[arrays.PLANET_RADIUS] + constants.SPAWN_RADIUS
+            row = np.zeros(arrays.SHIP_COLUMNS)
+            row[[arrays.SHIP_OWNER, arrays.SHIP_ID, arrays.SHIP_HEALTH, arrays.SHIP_PLANET]] = (
+                planet[arrays.PLANET_OWNER], next_id, constants.BASE_SHIP_HEALTH, arrays.NONE)
+            row[arrays.SHIP_X] = planet[arrays.PLANET_X] + distance * math.cos(angle)
+            row[arrays.SHIP_Y] = planet[arrays.PLANET_Y] + distance * math.sin(angle)
+            spawned.append(row)
+            next_id += 1
+        if spawned:
+            self.ships = np.vstack([self.ships] + spawned)
+
+
+class EngineTransport:
+    """
+    Connects a :class:`networking.Game` to a :class:`LocalEngine`: reads come from the engine's
+    frames and each newline-terminated write is handed to the engine as the turn's commands.
+    """
+
+    def __init__(self, engine):
+        self._engine = engine
+        self._lines = [str(engine.my_id), "{} {}".format(engine.width, engine.height), engine.frame()]
+        self._sent = []
+        self._named = False
+
+    def readline(self):
+        """
+        :return: The next line from the engine
+        :rtype: str
+        :raises GameOver: When the game has ended
+        """
+        if not self._lines:
+            raise GameOver()
+        return self._lines.pop(0)
+
+    def write(self, s):
+        """
+        Collect what the bot sends, handing a finished line to the engine.
+        """
+        *lines, rest = s.split('\n')
+        for line in lines:
+            sent = ''.join(self._sent) + line
+            self._sent = []
+            if not self._named:
+                # the first line is the bot's name
+                self._named = True
+            else:
+                self._engine.step(sent)
+            if not self._engine.finished:
+                self._lines.append(self._engine.next_frame())
+        if rest:
+            self._sent.append(rest)
+
+    def flush(self):
+        pass
@@ -22,6 +22,9 @@ class Entity(object):
     __metaclass__ = abc.ABCMeta
 
     COORDS_MASK = np.array([1,1,0,0])
+    # the map's distances.DistanceTable this entity is part of, if any, and its row in it
+    distance_table = None
+    _table_row = None
     
     def __init__(self, x, y, radius, health, player, entity_id):
         self.x = x
@@ -34,6 +37,8 @@ class Entity(object):
         self.array = np.array([x, y, radius, player])
 
     def calculate_relative_distance(self, other, coords_mask=COORDS_MASK):
+        if coords_mask is Entity.COORDS_MASK:
+            return self.calculate_distance_between(other)
         other_pos = (other.array * coords_mask)
         self_pos = self.array * coords_mask
 
@@ -48,6 +53,10 @@ class Entity(object):
         :return: distance
         :rtype: float
         """
+        if self.distance_table is not None:
+            distance = self.distance_table.distance(self, target)
+            if distance is not None:
+                return distance
         return math.sqrt((target.x - self.x) ** 2 + (target.y - self.y) ** 2)
 
     def calculate_angle_between(self, target):
@@ -58,6 +67,10 @@ class Entity(object):
         :return: Angle between entities in degrees
         :rtype: float
         """
+        if self.distance_table is not None:
+            angle = self.distance_table.angle(self, target)
+            if angle is not None:
+                return angle
         return math.degrees(math.atan2(target.y - self.y, target.x - self.x)) % 360
 
     def closest_point_to(self, target, min_distance=3):
@@ -70,10 +83,11 @@ class Entity(object):
         :return: The closest point's coordinates
         :rtype: Position
         """
-        angle = target.calculate_angle_between(self)
+        # stay in radians, see geometry.closest_points for many targets at once
+        angle = math.atan2(self.y - target.y, self.x - target.x)
         radius = target.radius + min_distance
-        x = target.x + radius * math.cos(math.radians(angle))
-        y = target.y + radius * math.sin(math.radians(angle))
+        x = target.x + radius * math.cos(angle)
+        y = target.y + radius * math.sin(angle)
 
         return Position(x, y)
 
@@ -228,6 +242,8 @@ class Ship(Entity):
     :ivar radius: The ship radius.
     :ivar health: The ship's remaining health.
     :ivar DockingStatus docking_status: The docking status (UNDOCKED, DOCKED, DOCKING, UNDOCKING)
+    :ivar vel_x: The ship's x-velocity as reported by the engine.
+    :ivar vel_y: The ship's y-velocity as reported by the engine.
     :ivar planet: The ID of the planet the ship is docked to, if applicable.
     :ivar owner: The player ID of the owner, if any. If None, Entity is not owned.
     """
@@ -247,6 +263,8 @@ class Ship(Entity):
         #self.owner = player_id
         #self.radius = constants.SHIP_RADIUS
         #self.health = hp
+        self.vel_x = vel_x
+        self.vel_y = vel_y
         self.docking_status = docking_status
         self.planet = planet if (docking_status is not Ship.DockingStatus.UNDOCKED) else None
         self._docking_progress = progress
@@ -288,7 +306,7 @@ class Ship(Entity):
     # TODO: Fix this to take account of existing velocity
     # TODO: GPU accelerate this
     def navigate(self, target, game_map, speed, avoid_obstacles=True, max_corrections=90, angular_step=1,
-                 ignore_ships=False, ignore_planets=False, angle_dodges=None):
+                 ignore_ships=False, ignore_planets=False, angle_dodges=None, predict_motion=False, cache=None):
         """
         Move a ship to a specific target position (Entity). It is recommended to place the position
         itself here, else navigate will crash into the target. If avoid_obstacles is set to True (default)
@@ -305,10 +323,15 @@ class Ship(Entity):
         :param int angular_step: The degree difference to deviate if the original destination has obstacles
         :param bool ignore_ships: Whether to ignore ships in calculations (this will make your movement faster, but more precarious)
         :param bool ignore_planets: Whether to ignore planets in calculations (useful if you want to crash onto planets)
+        :param bool predict_motion: Whether to also dodge ships that would collide with the move once their velocity is extrapolated over the turn
+        :param navigation.NavigationCache cache: Cache to reuse the previous turn's heading from, if still valid
         :return string: The command trying to be passed to the Halite engine or None if movement is not possible within max_corrections degrees.
         :rtype: str
         """
         # Assumes a position, not planet (as it would go to the center of the planet otherwise)
+        if cache is not None:
+            return cache.navigate(self, target, game_map, speed, avoid_obstacles, max_corrections, angular_step,
+                                  ignore_ships, ignore_planets, angle_dodges, predict_motion)
         if max_corrections <= 0:
             return None
         distance = self.calculate_distance_between(target)
@@ -317,14 +340,18 @@ class Ship(Entity):
             else Ship if (ignore_ships and not ignore_planets) \
             else Planet if (ignore_planets and not ignore_ships) \
             else Entity
-        if avoid_obstacles and game_map.obstacles_between(self, target, ignore):
+        speed = speed if (distance >= speed) else distance
+        if avoid_obstacles and (game_map.obstacles_between(self, target, ignore) or (
+                predict_motion and game_map.moving_collisions(
+                    self, int(speed) * math.cos(math.radians(round(angle))),
+                    int(speed) * math.sin(math.radians(round(angle)))))):
             dodge_angle = math.radians(angle + angular_step) + (
                 next(angle_dodges) if angle_dodges else 0)
             new_target_dx = math.cos(dodge_angle) * distance
             new_target_dy = math.sin(dodge_angle) * distance
             new_target = Position(self.x + new_target_dx, self.y + new_target_dy)
-            return self.navigate(new_target, game_map, speed, True, max_corrections - 1, angular_step)
-        speed = speed if (distance >= speed) else distance
+            return self.navigate(new_target, game_map, speed, True, max_corrections - 1, angular_step,
+                                 predict_motion=predict_motion)
         return self.thrust(speed, angle)
 
     def can_dock(self, planet):
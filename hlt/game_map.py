@@ -1,4 +1,5 @@
-from . import collision, entity
+from . import arrays, collision, constants, distances, entity, selection
+import math
 import numpy as np
 
 class Map:
@@ -8,19 +9,33 @@ class Map:
     :ivar my_id: Current player id associated with the map
     :ivar width: Map width
     :ivar height: Map height
+    :ivar distances: This turn's distances.DistanceTable, rebuilt every time the map is parsed
+    :ivar lazy: Whether parsing only fills the ship and planet arrays, building each ship and planet
+        object the first time it is asked for
+    :ivar selector: The selection.AlgorithmSelector picking the implementation of the map queries,
+        kept across parses
     """
 
-    def __init__(self, my_id, width, height):
+    def __init__(self, my_id, width, height, lazy=False, selector=None):
         """
         :param my_id: User's id (tag)
         :param width: Map width
         :param height: Map height
+        :param bool lazy: Build entity objects on demand rather than when parsing
+        :param selection.AlgorithmSelector selector: Selector to use, a new (uncalibrated) one by default
         """
         self.my_id = my_id
         self.width = width
         self.height = height
+        self.lazy = lazy
+        self.selector = selection.AlgorithmSelector() if selector is None else selector
         self._players = {}
         self._planets = {}
+        self._ship_rows = None
+        self._planet_rows = None
+        # this parse's (ship rows, planet rows), see frame_rows
+        self._frame_rows = None
+        self.distances = None
 
     def get_me(self):
         """
@@ -67,6 +82,7 @@ class Map:
         ship = self.get_me().get_ship(ship_id)
         result_as_complex = move_as_complex + np.complex(ship.x, ship.y)
         ship.x, ship.y = result_as_complex.real, result_as_complex.imag
+        ship.distance_table = None
         
         
     def nearby_entities_by_distance(self, entity):
@@ -90,6 +106,8 @@ class Map:
         """
         for celestial_object in self.all_planets() + self.all_ships():
             celestial_object._link(self._players, self._planets)
+        self._frame_rows = None
+        self.distances = distances.DistanceTable(self.all_ships(), self.all_planets(), selector=self.selector)
 
     def _parse(self, map_string):
         """
@@ -98,6 +116,10 @@ class Map:
         :param map_string: The string which the Halite engine outputs
         :return: nothing
         """
+        if self.lazy:
+            ships, planets, player_ids = arrays.frame_to_arrays(map_string)
+            self._load_lazy(ships, planets, player_ids)
+            return
         tokens = map_string.split()
 
         self._players, tokens = Player._parse(tokens)
@@ -106,6 +128,113 @@ class Map:
         assert(len(tokens) == 0)  # There should be no remaining tokens at this point
         self._link()
 
+    def frame_rows(self):
+        """
+        The ship and planet rows of the current parse, see :mod:`hlt.arrays` for the columns.
+        Built once per parse (a lazily parsed map already has them) and shared by every caller,
+        so they are read-only: use :meth:`ship_array` and :meth:`planet_array` for copies.
+
+        :return: One row per ship, and one row per planet
+        :rtype: (np.ndarray, np.ndarray)
+        """
+        if self._frame_rows is None:
+            if self._ship_rows is not None:
+                self._frame_rows = (self._ship_rows, self._planet_rows)
+            else:
+                ships, planets = arrays.ships_to_array(self.all_ships()), arrays.planets_to_array(self.all_planets())
+                ships.flags.writeable = planets.flags.writeable = False
+                self._frame_rows = (ships, planets)
+        return self._frame_rows
+
+    def ship_array(self, out=None):
+        """
+        Flatten all ships into a numeric array, see :mod:`hlt.arrays` for the columns.
+
+        :param np.ndarray out: Optional preallocated array to fill, with at least one row per ship
+        :return: One row per ship
+        :rtype: np.ndarray
+        """
+        return _copy_rows(self.frame_rows()[0], out)
+
+    def planet_array(self, out=None):
+        """
+        Flatten all planets into a numeric array, see :mod:`hlt.arrays` for the columns.
+
+        :param np.ndarray out: Optional preallocated array to fill, with at least one row per planet
+        :return: One row per planet
+        :rtype: np.ndarray
+        """
+        return _copy_rows(self.frame_rows()[1], out)
+
+    def _load_arrays(self, ships, planets, player_ids=()):
+        """
+        Rebuild the map from flattened ship and planet rows instead of the engine's text.
+
+        :param np.ndarray ships: Ship rows
+        :param np.ndarray planets: Planet rows
+        :param player_ids: Ids of players to include even if they have no ships
+        :return: nothing
+        """
+        if self.lazy:
+            owners = set(ships[:, arrays.SHIP_OWNER].astype(int).tolist())
+            self._load_lazy(ships, planets, sorted(set(player_ids) | owners))
+            return
+        ships_by_owner = arrays.ships_from_array(ships)
+        self._players = {player_id: Player(player_id, ships_by_owner.get(player_id, {}))
+                         for player_id in sorted(set(player_ids) | set(ships_by_owner))}
+        self._planets = arrays.planets_from_array(planets, ships)
+        self._link()
+
+    def _load_lazy(self, ships, planets, player_ids):
+        """
+        Keep the rows of a parsed frame, and set up the players and planets to build each entity
+        from its row on first access.
+
+        :param np.ndarray ships: Ship rows
+        :param np.ndarray planets: Planet rows
+        :param list[int] player_ids: Ids of all players, in the order to keep them
+        :return: nothing
+        """
+        # read-only views: the entities and the distance table are built from them during the turn
+        self._ship_rows, self._planet_rows = ships.view(), planets.view()
+        self._ship_rows.flags.writeable = self._planet_rows.flags.writeable = False
+        owners = ships[:, arrays.SHIP_OWNER].astype(int)
+        self._ship_keys = list(zip(owners.tolist(), ships[:, arrays.SHIP_ID].astype(int).tolist()))
+        self._planet_keys = planets[:, arrays.PLANET_ID].astype(int).tolist()
+        self._players = {player_id: Player(player_id, _LazyEntities(
+            {ship_id: row for row, (owner, ship_id) in enumerate(self._ship_keys) if owner == player_id},
+            self._build_ship, self._link_entity)) for player_id in player_ids}
+        self._planets = _LazyEntities({plid: row for row, plid in enumerate(self._planet_keys)},
+                                      self._build_planet, self._link_entity)
+        self._docked_ship_ids = None
+        self._frame_rows = None
+        self.distances = distances.DistanceTable(_LazyRows(len(ships), self._ship_at),
+                                                 _LazyRows(len(planets), self._planet_at),
+                                                 self._ship_rows, self._planet_rows, self.selector)
+
+    def _ship_at(self, row):
+        owner, ship_id = self._ship_keys[row]
+        return self._players[owner].get_ship(ship_id)
+
+    def _planet_at(self, row):
+        return self._planets.get(self._planet_keys[row])
+
+    def _build_ship(self, row):
+        return arrays.ship_from_row(self._ship_rows[row].tolist())
+
+    def _build_planet(self, row):
+        if self._docked_ship_ids is None:
+            self._docked_ship_ids = arrays.docked_ship_ids(self._ship_rows)
+        planet_row = self._planet_rows[row].tolist()
+        return arrays.planet_from_row(planet_row, self._docked_ship_ids.get(int(planet_row[arrays.PLANET_ID]), []))
+
+    def _link_entity(self, celestial_object, row):
+        """
+        Link an entity built on demand to its owner, planet or docked ships, and to the distance table.
+        """
+        celestial_object._link(self._players, self._planets)
+        self.distances.register(celestial_object, row)
+
     def all_ships(self):
         """
         Helper function to extract all ships from all players
@@ -134,25 +263,201 @@ class Map:
                 return celestial_object
         return None
 
-    def obstacles_between(self, ship, target, ignore=()):
+    def _entity_range(self, ignore_ships, ignore_planets):
+        """
+        :return: The slice of the distance table's entities (planets then ships) not ignored
+        """
+        num_planets = self.distances.num_planets()
+        start = num_planets if ignore_planets else 0
+        stop = num_planets if ignore_ships else self.distances.num_entities()
+        return start, stop
+
+    def _candidates(self, algorithm, centre, reach, start, stop):
+        """
+        :return: The indices in [start, stop) of the distance table's entities to test exactly:
+            all of them, or those the KD-tree finds within reach of the centre, in order
+        """
+        if algorithm == 'kdtree':
+            return np.array(sorted(n for n in self.distances.tree().query_ball_point(centre, reach)
+                                   if start <= n < stop), dtype=int)
+        return np.arange(start, stop)
+
+    def obstacles_between(self, ship, target, ignore=(), algorithm=None):
         """
         Check whether there is a straight-line path to the given point, without planetary obstacles in between.
 
         :param entity.Ship ship: Source entity
         :param entity.Entity target: Target entity
         :param entity.Entity ignore: Which entity type to ignore
+        :param str algorithm: 'loop', 'vectorized' or 'kdtree', by default the fastest for the number
+            of entities (see :mod:`hlt.selection`)
         :return: The list of obstacles between the ship and target
         :rtype: list[entity.Entity]
         """
-        obstacles = []
-        entities = ([] if issubclass(entity.Planet, ignore) else self.all_planets()) \
-            + ([] if issubclass(entity.Ship, ignore) else self.all_ships())
-        for foreign_entity in entities:
-            if foreign_entity == ship or foreign_entity == target:
-                continue
-            if collision.intersect_segment_circle(ship, target, foreign_entity, fudge=ship.radius + 0.1):
-                obstacles.append(foreign_entity)
-        return obstacles
+        ignore_planets, ignore_ships = issubclass(entity.Planet, ignore), issubclass(entity.Ship, ignore)
+        start, stop = self._entity_range(ignore_ships, ignore_planets)
+        algorithm = algorithm or self.selector.choose('obstacles', stop - start)
+        if algorithm == 'loop':
+            obstacles = []
+            entities = ([] if ignore_planets else self.all_planets()) + ([] if ignore_ships else self.all_ships())
+            for foreign_entity in entities:
+                if foreign_entity == ship or foreign_entity == target:
+                    continue
+                if collision.intersect_segment_circle(ship, target, foreign_entity, fudge=ship.radius + 0.1):
+                    obstacles.append(foreign_entity)
+            return obstacles
+
+        fudge = ship.radius + 0.1
+        circles = self.distances.circles()
+        # the segment's bounding circle, grown by the largest radius
+        reach = ship.calculate_distance_between(target) / 2 + fudge + (circles[:, 2].max(initial=0))
+        candidates = self._candidates(algorithm, ((ship.x + target.x) / 2, (ship.y + target.y) / 2),
+                                      reach, start, stop)
+        hits = collision.intersect_segments_circles(
+            [[ship.x, ship.y, target.x, target.y]], circles[candidates], fudge=fudge)[0]
+        obstacles = [self.distances.entity(n) for n in candidates[hits].tolist()]
+        return [obstacle for obstacle in obstacles if obstacle is not ship and obstacle is not target]
+
+    def entities_within(self, entity, radius, ignore_ships=False, ignore_planets=False, algorithm=None):
+        """
+        Find the ships and planets near an entity.
+
+        :param entity.Entity entity: The entity to search around
+        :param float radius: Greatest distance from the entity's centre to the other entities' surface
+        :param bool ignore_ships: Whether to leave out ships
+        :param bool ignore_planets: Whether to leave out planets
+        :param str algorithm: 'loop', 'vectorized' or 'kdtree', by default the fastest for the number
+            of entities (see :mod:`hlt.selection`)
+        :return: The entities within radius, planets first, not including the entity itself
+        :rtype: list[entity.Entity]
+        """
+        start, stop = self._entity_range(ignore_ships, ignore_planets)
+        algorithm = algorithm or self.selector.choose('neighbours', stop - start)
+        if algorithm == 'loop':
+            entities = ([] if ignore_planets else self.all_planets()) + ([] if ignore_ships else self.all_ships())
+            return [other for other in entities
+                    if other is not entity and entity.calculate_distance_between(other) <= radius + other.radius]
+
+        circles = self.distances.circles()
+        candidates = self._candidates(algorithm, (entity.x, entity.y), radius + circles[:, 2].max(initial=0),
+                                      start, stop)
+        close = np.hypot(circles[candidates, 0] - entity.x, circles[candidates, 1] - entity.y) <= \
+            radius + circles[candidates, 2]
+        neighbours = [self.distances.entity(n) for n in candidates[close].tolist()]
+        return [neighbour for neighbour in neighbours if neighbour is not entity]
+
+    def moving_collisions(self, ship, vel_x, vel_y, fudge=0.1, algorithm=None):
+        """
+        Check a planned move against every other ship, with their velocities extrapolated over the turn.
+
+        :param entity.Ship ship: The ship to move
+        :param float vel_x: The planned x-velocity of the ship
+        :param float vel_y: The planned y-velocity of the ship
+        :param float fudge: Additional distance to leave between ships
+        :param str algorithm: 'loop', 'vectorized' or 'kdtree', by default the fastest for the number
+            of ships (see :mod:`hlt.selection`)
+        :return: The ships the move would collide with
+        :rtype: list[entity.Ship]
+        """
+        num_planets = self.distances.num_planets()
+        num_ships = self.distances.num_entities() - num_planets
+        algorithm = algorithm or self.selector.choose('collisions', num_ships)
+        if algorithm == 'loop':
+            collisions = []
+            for other in self.all_ships():
+                if other is ship:
+                    continue
+                # closest approach during the turn, relative to the ship
+                offset_x, offset_y = other.x - ship.x, other.y - ship.y
+                relative_x, relative_y = other.vel_x - vel_x, other.vel_y - vel_y
+                speed_squared = relative_x ** 2 + relative_y ** 2
+                t = 0.0 if speed_squared == 0 else \
+                    min(max(-(offset_x * relative_x + offset_y * relative_y) / speed_squared, 0.0), 1.0)
+                if math.hypot(offset_x + relative_x * t, offset_y + relative_y * t) <= \
+                        ship.radius + other.radius + fudge:
+                    collisions.append(other)
+            return collisions
+
+        velocities = self.distances.ship_velocities()
+        # how far apart two ships can start and still meet during the turn
+        reach = math.hypot(vel_x, vel_y) + np.sqrt((velocities ** 2).sum(axis=1)).max(initial=0) + \
+            ship.radius + constants.SHIP_RADIUS + fudge
+        candidates = self._candidates(algorithm, (ship.x, ship.y), reach, num_planets, num_planets + num_ships)
+        rows = candidates - num_planets
+        hits, _ = collision.swept_collisions(
+            [[ship.x, ship.y]], [[vel_x, vel_y]], ship.radius,
+            self.distances.circles()[candidates, 0:2], velocities[rows], constants.SHIP_RADIUS, fudge=fudge)
+        others = [self.distances.entity(n) for n in candidates[hits[0]].tolist()]
+        return [other for other in others if other is not ship]
+
+
+def _copy_rows(rows, out):
+    """
+    :return: The rows copied into out if given, else a copy of them
+    """
+    if out is None:
+        return rows.copy()
+    out[:len(rows)] = rows
+    return out[:len(rows)]
+
+
+class _LazyEntities:
+    """
+    Read-only mapping of ids to entities, each built from its row the first time it is looked up
+    """
+
+    def __init__(self, rows, build, link):
+        """
+        :param dict[int, int] rows: The row of each id
+        :param build: Called with a row, returns the entity with ids not yet linked
+        :param link: Called with the entity and its row once the entity is cached
+        """
+        self._rows = rows
+        self._build = build
+        self._link = link
+        self._built = {}
+
+    def get(self, key, default=None):
+        built = self._built.get(key)
+        if built is None:
+            row = self._rows.get(key)
+            if row is None:
+                return default
+            # cached before linking, as a planet and its docked ships link to each other
+            built = self._built[key] = self._build(row)
+            self._link(built, row)
+        return built
+
+    def values(self):
+        return [self.get(key) for key in self._rows]
+
+    def keys(self):
+        return self._rows.keys()
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+
+class _LazyRows:
+    """
+    Sequence of the entities of a map's rows, built on access
+    """
+
+    def __init__(self, count, get):
+        self._count = count
+        self._get = get
+
+    def __getitem__(self, row):
+        return self._get(row)
+
+    def __len__(self):
+        return self._count
 
 
 class Player:
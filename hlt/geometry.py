@@ -0,0 +1,112 @@
+"""
+Array versions of the per-entity geometry helpers, for many ships and targets at once.
+
+Each function matches its scalar counterpart on :class:`entity.Entity` or :class:`entity.Ship`,
+taking positions as N x 2 arrays and circles (planets, ships) as M x 3 arrays of x, y, radius.
+"""
+import numpy as np
+
+from . import constants
+
+
+def positions(entities):
+    """
+    :param entities: Entities (ships, planets, positions)
+    :return: N x 2 array of their x, y
+    :rtype: np.ndarray
+    """
+    return np.array([(entity.x, entity.y) for entity in entities], dtype=float).reshape(-1, 2)
+
+
+def circles(entities):
+    """
+    :param entities: Entities (ships, planets)
+    :return: N x 3 array of their x, y, radius
+    :rtype: np.ndarray
+    """
+    return np.array([(entity.x, entity.y, entity.radius) for entity in entities], dtype=float).reshape(-1, 3)
+
+
+def angles_between(sources, targets):
+    """
+    Angle from every source to every target, like Entity.calculate_angle_between.
+
+    :param np.ndarray sources: N x 2 array of positions
+    :param np.ndarray targets: M x 2 (or M x 3) array of positions
+    :return: N x M array of angles in degrees, in [0, 360)
+    :rtype: np.ndarray
+    """
+    offset = _offsets(sources, targets)
+    return np.degrees(np.arctan2(offset[:, :, 1], offset[:, :, 0])) % 360
+
+
+def closest_points(sources, targets, min_distance=3):
+    """
+    Point near every target closest to every source, min_distance outside the target's radius,
+    like Entity.closest_point_to.
+
+    :param np.ndarray sources: N x 2 array of positions
+    :param np.ndarray targets: M x 3 array of x, y, radius
+    :param float min_distance: Minimum distance from the targets' outer radius
+    :return: N x M x 2 array of points
+    :rtype: np.ndarray
+    """
+    targets = np.asarray(targets, dtype=float)
+    # from the target towards the source
+    offset = -_offsets(sources, targets)
+    length = np.sqrt((offset ** 2).sum(axis=2, keepdims=True))
+    # a source at the target's centre is approached from angle 0, as atan2(0, 0) is 0
+    direction = np.divide(offset, length, out=np.broadcast_to([1.0, 0.0], offset.shape).copy(), where=length != 0)
+    radius = targets[np.newaxis, :, 2:3] + min_distance
+    return targets[np.newaxis, :, 0:2] + direction * radius
+
+
+def can_dock(ships, planets):
+    """
+    Whether every ship is close enough to dock on every planet, like Ship.can_dock.
+
+    :param np.ndarray ships: N x 2 array of ship positions
+    :param np.ndarray planets: M x 3 array of planet x, y, radius
+    :return: N x M boolean array
+    :rtype: np.ndarray
+    """
+    planets = np.asarray(planets, dtype=float)
+    distances = np.sqrt((_offsets(ships, planets) ** 2).sum(axis=2))
+    return distances <= planets[np.newaxis, :, 2] + constants.DOCK_RADIUS
+
+
+def thrust_commands(ship_ids, magnitudes, angles):
+    """
+    Thrust commands for many ships, like Ship.thrust: magnitudes are rounded down and
+    angles to the nearest integer.
+
+    :param ship_ids: N ship ids
+    :param magnitudes: N speeds
+    :param angles: N angles in degrees
+    :return: The command strings
+    :rtype: list[str]
+    """
+    magnitudes = np.asarray(magnitudes, dtype=float).astype(int)
+    angles = np.round(np.asarray(angles, dtype=float)).astype(int)
+    return list(map("t {} {} {}".format, np.asarray(ship_ids).tolist(), magnitudes.tolist(), angles.tolist()))
+
+
+def dock_commands(ship_ids, planet_ids):
+    """
+    Dock commands for many ships, like Ship.dock.
+
+    :param ship_ids: N ship ids
+    :param planet_ids: N ids of the planets to dock to
+    :return: The command strings
+    :rtype: list[str]
+    """
+    return list(map("d {} {}".format, np.asarray(ship_ids).tolist(), np.asarray(planet_ids).tolist()))
+
+
+def _offsets(sources, targets):
+    """
+    :return: N x M x 2 array of the offsets from every source to every target
+    """
+    sources = np.asarray(sources, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+    return targets[np.newaxis, :, 0:2] - sources[:, np.newaxis, 0:2]
@@ -0,0 +1,158 @@
+"""
+Bounded history of past turns.
+
+The last few turns' ship and planet arrays (see :mod:`hlt.arrays`) are kept in a ring
+buffer that is allocated once, so memory stays constant however long the game runs.
+Queries work on the whole buffer at once.
+"""
+import logging
+
+import numpy as np
+
+from . import arrays
+
+
+class TurnHistory:
+    """
+    :ivar capacity: Number of turns kept
+    """
+
+    def __init__(self, capacity=16, max_ships=1024, max_planets=128):
+        """
+        :param int capacity: Number of turns to keep
+        :param int max_ships: Ships recorded per turn; any more are dropped
+        :param int max_planets: Planets recorded per turn; any more are dropped
+        """
+        self.capacity = capacity
+        self._ships = np.full((capacity, max_ships, arrays.SHIP_COLUMNS), np.nan)
+        self._planets = np.full((capacity, max_planets, arrays.PLANET_COLUMNS), np.nan)
+        self._turns = np.full(capacity, -1, dtype=int)
+        self._num_ships = np.zeros(capacity, dtype=int)
+        self._num_planets = np.zeros(capacity, dtype=int)
+
+    def record(self, turn, game_map):
+        """
+        Store the map of the given turn, overwriting the oldest stored turn.
+
+        :param int turn: The turn number
+        :param game_map.Map game_map: The parsed map of that turn
+        :return: nothing
+        """
+        slot = turn % self.capacity
+        ships, planets = game_map.frame_rows()
+        num_ships, num_planets = len(ships), len(planets)
+        max_ships, max_planets = self._ships.shape[1], self._planets.shape[1]
+        if num_ships > max_ships or num_planets > max_planets:
+            logging.warning("History holds {} ships and {} planets, dropping the rest of {} and {}".format(
+                max_ships, max_planets, num_ships, num_planets))
+            num_ships, num_planets = min(num_ships, max_ships), min(num_planets, max_planets)
+            self._ships[slot, :num_ships] = ships[:num_ships]
+            self._planets[slot, :num_planets] = planets[:num_planets]
+        else:
+            # straight into the slot: nothing is allocated per turn
+            game_map.ship_array(out=self._ships[slot, :num_ships])
+            game_map.planet_array(out=self._planets[slot, :num_planets])
+
+        self._ships[slot, num_ships:, arrays.SHIP_ID] = arrays.NONE
+        self._planets[slot, num_planets:, arrays.PLANET_ID] = arrays.NONE
+        self._num_ships[slot] = num_ships
+        self._num_planets[slot] = num_planets
+        self._turns[slot] = turn
+
+    def latest(self):
+        """
+        :return: Views of the ship and planet rows of the most recently recorded turn
+        :rtype: (np.ndarray, np.ndarray)
+        """
+        slot = int(np.argmax(self._turns))
+        return self._ships[slot, :self._num_ships[slot]], self._planets[slot, :self._num_planets[slot]]
+
+    def turns(self):
+        """
+        :return: The stored turn numbers, oldest first
+        :rtype: np.ndarray
+        """
+        return self._turns[self._order()]
+
+    def _order(self):
+        """
+        Slots holding a turn, oldest first
+        """
+        stored = np.flatnonzero(self._turns >= 0)
+        return stored[np.argsort(self._turns[stored])]
+
+    def _ship_column(self, ship_id, columns):
+        """
+        The given columns of one ship for every stored turn, oldest first, NaN where it is absent
+        """
+        order = self._order()
+        result = np.full((len(order), len(columns)), np.nan)
+        turn_index, row = np.nonzero(self._ships[order, :, arrays.SHIP_ID] == ship_id)
+        result[turn_index] = self._ships[order[turn_index], row][:, columns]
+        return result
+
+    def ship_positions(self, ship_id):
+        """
+        :param int ship_id: The ship to look up
+        :return: Turns x 2 array of the ship's position per stored turn, oldest first, NaN where it did not exist
+        :rtype: np.ndarray
+        """
+        return self._ship_column(ship_id, [arrays.SHIP_X, arrays.SHIP_Y])
+
+    def ship_health(self, ship_id):
+        """
+        :param int ship_id: The ship to look up
+        :return: The ship's health per stored turn, oldest first, NaN where it did not exist
+        :rtype: np.ndarray
+        """
+        return self._ship_column(ship_id, [arrays.SHIP_HEALTH])[:, 0]
+
+    def health_trend(self, ship_id):
+        """
+        :param int ship_id: The ship to look up
+        :return: Least-squares change in health per turn over the stored turns, 0 if seen fewer than twice
+        :rtype: float
+        """
+        health = self.ship_health(ship_id)
+        seen = ~np.isnan(health)
+        if seen.sum() < 2:
+            return 0.0
+        return np.polyfit(self.turns()[seen], health[seen], 1)[0]
+
+    def estimated_velocities(self):
+        """
+        Estimate every ship's velocity from its positions in the last two stored turns.
+
+        :return: The ids of ships present in both turns, and their velocities in distance per turn (N x 2)
+        :rtype: (np.ndarray, np.ndarray)
+        """
+        order = self._order()
+        if len(order) < 2:
+            return np.empty(0, dtype=int), np.empty((0, 2))
+        previous, latest = self._ships[order[-2]], self._ships[order[-1]]
+        elapsed = self._turns[order[-1]] - self._turns[order[-2]]
+        ids, latest_rows, previous_rows = np.intersect1d(
+            latest[:, arrays.SHIP_ID], previous[:, arrays.SHIP_ID], return_indices=True)
+        present = ids != arrays.NONE
+        positions = [arrays.SHIP_X, arrays.SHIP_Y]
+        velocities = (latest[latest_rows[present]][:, positions] -
+                      previous[previous_rows[present]][:, positions]) / elapsed
+        return ids[present].astype(int), velocities
+
+    def planet_owners(self):
+        """
+        Ownership timeline of every planet.
+
+        :return: The planet ids, and a turns x planets array of owner ids, oldest first. -1 when the planet
+            was unowned or no longer exists.
+        :rtype: (np.ndarray, np.ndarray)
+        """
+        planets = self._planets[self._order()]
+        ids = planets[:, :, arrays.PLANET_ID]
+        turn_index, row = np.nonzero(ids >= 0)
+        planet_ids = np.unique(ids[turn_index, row]).astype(int)
+        owners = np.full((len(planets), len(planet_ids)), arrays.NONE, dtype=int)
+        owned = planets[turn_index, row, arrays.PLANET_OWNED] > 0
+        owners[turn_index, np.searchsorted(planet_ids, ids[turn_index, row])] = np.where(
+            owned, planets[turn_index, row, arrays.PLANET_OWNER], arrays.NONE)
+        return planet_ids, owners
@@ -0,0 +1,163 @@
+"""
+Cross-turn navigation cache.
+
+Most ships keep the same target for many turns and fly past the same obstacles, so the
+heading Ship.navigate found by dodging last turn is usually still a good one. The cache
+remembers, per ship that had to dodge, the target, the obstacles that blocked the direct
+heading and the deviation from the direct heading. While the target is unchanged, those
+obstacles still block the direct heading and the path along the deviated heading is
+clear, the heading is reused: one path check instead of the dodge search. Ships with a
+clear direct heading are navigated as usual, at no extra cost.
+"""
+import logging
+import math
+import time
+
+from . import collision, entity
+
+
+class NavigationCache:
+    """
+    :ivar hits: Number of navigations answered from the cache
+    :ivar misses: Number of navigations that ran the full dodge search
+    :ivar invalidations: Number of misses caused by a changed target or cleared obstacles
+    """
+
+    def __init__(self, target_resolution=2.0):
+        """
+        :param float target_resolution: Grid size targets are rounded to before comparing
+        """
+        self.target_resolution = target_resolution
+        # ship id -> (target key, blocking obstacles as (is planet, owner id, id), deviation from the
+        # direct heading in degrees)
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.hit_time = 0.0
+        self.miss_time = 0.0
+
+    def _target_key(self, target):
+        return (round(target.x / self.target_resolution), round(target.y / self.target_resolution))
+
+    @staticmethod
+    def _ignored(ignore_ships, ignore_planets):
+        return () if not (ignore_ships or ignore_planets) \
+            else entity.Ship if (ignore_ships and not ignore_planets) \
+            else entity.Planet if (ignore_planets and not ignore_ships) \
+            else entity.Entity
+
+    @staticmethod
+    def _still_blocking(ship, target, game_map, blockers):
+        """
+        :return: True if all the obstacles that blocked the direct heading are still on the map and
+            in the way, checked one by one without searching the map
+        """
+        for is_planet, owner_id, obstacle_id in blockers:
+            if is_planet:
+                obstacle = game_map.get_planet(obstacle_id)
+            else:
+                owner = game_map.get_player(owner_id)
+                obstacle = owner.get_ship(obstacle_id) if owner else None
+            if obstacle is None or not collision.intersect_segment_circle(
+                    ship, target, obstacle, fudge=ship.radius + 0.1):
+                return False
+        return True
+
+    def navigate(self, ship, target, game_map, speed, avoid_obstacles=True, max_corrections=90, angular_step=1,
+                 ignore_ships=False, ignore_planets=False, angle_dodges=None, predict_motion=False):
+        """
+        Ship.navigate, reusing last turn's heading for this ship when it is still valid.
+        Takes the same parameters as :meth:`entity.Ship.navigate`.
+
+        :return string: The command trying to be passed to the Halite engine or None if movement is not possible.
+        :rtype: str
+        """
+        start = time.perf_counter()
+        target_key = self._target_key(target)
+        entry = self._entries.get(ship.id)
+        if entry is not None and entry[0] == target_key and \
+                self._still_blocking(ship, target, game_map, entry[1]):
+            command = self._reuse(ship, target, game_map, speed, entry[2], ignore_ships, ignore_planets,
+                                  predict_motion)
+            if command is not None:
+                self.hits += 1
+                self.hit_time += time.perf_counter() - start
+                return command
+        elif entry is not None:
+            self.invalidations += 1
+
+        command = ship.navigate(target, game_map, speed, avoid_obstacles, max_corrections, angular_step,
+                                ignore_ships, ignore_planets, angle_dodges, predict_motion)
+        self._entries.pop(ship.id, None)
+        if command is not None:
+            angle = ship.calculate_angle_between(target)
+            deviation = (int(command.split()[3]) - round(angle) + 180) % 360 - 180
+            if deviation:
+                # only worth remembering when the direct heading was blocked by obstacles we can check
+                blockers = [(isinstance(obstacle, entity.Planet),
+                             None if isinstance(obstacle, entity.Planet) else obstacle.owner.id, obstacle.id)
+                            for obstacle in game_map.obstacles_between(
+                                ship, target, self._ignored(ignore_ships, ignore_planets))]
+                if blockers:
+                    self._entries[ship.id] = (target_key, blockers, deviation)
+        self.misses += 1
+        self.miss_time += time.perf_counter() - start
+        return command
+
+    def _reuse(self, ship, target, game_map, speed, deviation, ignore_ships, ignore_planets, predict_motion):
+        """
+        Thrust at the deviation from the direct heading to the target if the path along it is still clear, else None
+        """
+        distance = ship.calculate_distance_between(target)
+        heading = ship.calculate_angle_between(target) + deviation
+        waypoint = entity.Position(ship.x + math.cos(math.radians(heading)) * distance,
+                                   ship.y + math.sin(math.radians(heading)) * distance)
+        if game_map.obstacles_between(ship, waypoint, self._ignored(ignore_ships, ignore_planets)):
+            return None
+        speed = speed if (distance >= speed) else distance
+        if predict_motion and game_map.moving_collisions(
+                ship, int(speed) * math.cos(math.radians(round(heading))),
+                int(speed) * math.sin(math.radians(round(heading)))):
+            return None
+        return ship.thrust(speed, heading % 360)
+
+    def prune(self, ship_ids):
+        """
+        Forget ships that are no longer alive or no longer navigating.
+
+        :param ship_ids: Ids of the ships to keep
+        :return: nothing
+        """
+        keep = set(ship_ids)
+        for ship_id in [ship_id for ship_id in self._entries if ship_id not in keep]:
+            del self._entries[ship_id]
+
+    def hit_rate(self):
+        """
+        :return: The fraction of navigations answered from the cache
+        :rtype: float
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def time_saved(self):
+        """
+        Estimate the navigation time the cache saved, as the hits times the difference
+        between the average miss and hit times.
+
+        :return: Seconds saved
+        :rtype: float
+        """
+        if not (self.hits and self.misses):
+            return 0.0
+        return self.hits * (self.miss_time / self.misses - self.hit_time / self.hits)
+
+    def log_stats(self):
+        """
+        Log the hit and miss counts, hit rate and estimated time saved.
+
+        :return: nothing
+        """
+        logging.info("Navigation cache: {} hits, {} misses ({} invalidated), hit rate {:.2f}, saved {:.4f}s".format(
+            self.hits, self.misses, self.invalidations, self.hit_rate(), self.time_saved()))
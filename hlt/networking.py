@@ -1,59 +1,154 @@
 import sys
 import logging
 import copy
+import contextlib
+import gc
+import os
+import time
+import tracemalloc
 
-from . import game_map
+from . import constants, game_map, history, recorder, warmup
+
+
+# allocations traced per phase: those made by hlt code
+_HLT_TRACES = [tracemalloc.Filter(True, os.path.join(os.path.dirname(os.path.abspath(__file__)), '*'))]
+
+
+class GameOver(EOFError):
+    """
+    Raised when the engine has no more input for the bot: the game has ended.
+    """
+
+
+class StdioTransport:
+    """
+    Talks to the Halite engine over standard input and output, the way the real engine runs bots.
+    Any object with the same readline/write/flush methods can stand in for it, see :mod:`hlt.engine`.
+    """
+
+    def readline(self):
+        """
+        :return: The next line from the engine, without the newline
+        :rtype: str
+        """
+        line = sys.stdin.readline()
+        if not line:
+            raise GameOver()
+        return line.rstrip('\n')
+
+    def write(self, s):
+        sys.stdout.write(s)
+
+    def flush(self):
+        sys.stdout.flush()
 
 
 class Game:
     """
     :ivar map: Current map representation
     :ivar initial_map: The initial version of the map before game starts
+    :ivar turn: Number of maps parsed so far, the initial map being 0
+    :ivar history: The last few turns' maps, as arrays
+    :ivar timings: Seconds spent in each phase of the current turn, see :meth:`phase`
+    :ivar allocations: Memory allocated by hlt code in each phase of the current turn, as
+        tracemalloc.StatisticDiff lists, when tracing allocations
     """
-    @staticmethod
-    def _send_string(s):
+    def _send_string(self, s):
         """
         Send data to the game. Call :function:`done_sending` once finished.
 
         :param str s: String to send
         :return: nothing
         """
-        sys.stdout.write(s)
-        sys.stdout.flush()
+        self._transport.write(s)
+        self._transport.flush()
 
-    @staticmethod
-    def _done_sending():
+    def _done_sending(self):
         """
         Finish sending commands to the game.
 
         :return: nothing
         """
-        sys.stdout.write('\n')
-        sys.stdout.flush()
+        self._transport.write('\n')
+        self._transport.flush()
 
-    @staticmethod
-    def _get_string():
+    def _get_string(self):
         """
         Read input from the game.
 
         :return: The input read from the Halite engine
         :rtype: str
         """
-        result = sys.stdin.readline().rstrip('\n')
-        return result
+        return self._transport.readline()
 
-    @staticmethod
-    def send_command_queue(command_queue):
+    def send_command_queue(self, command_queue):
         """
-        Issue the given list of commands.
+        Issue the given list of commands through the game's transport, then end the turn.
 
         :param list[str] command_queue: List of commands to send the Halite engine
         :return: nothing
         """
-        for command in command_queue:
-            Game._send_string(command)
+        with self.phase('send'):
+            for command in command_queue:
+                self._send_string(command)
+
+            self._done_sending()
+        self._end_turn(command_queue)
 
-        Game._done_sending()
+    def _end_turn(self, command_queue):
+        """
+        Record the turn if recording, start timing the next one, and collect garbage if managing
+        garbage collection.
+
+        :param list[str] command_queue: The commands sent this turn
+        :return: nothing
+        """
+        if self._recorder is not None:
+            # every ship and planet of this turn's frame, not the history's bounded copy
+            ships, planets = self.map.frame_rows()
+            self._recorder.record(self.turn, ships, planets, command_queue, self.timings)
+        if self._trace_allocations:
+            logging.info("Allocations in turn {}:\n{}".format(self.turn, self.allocation_report()))
+        self.timings = {}
+        self.allocations = {}
+        if self._manage_gc:
+            # the engine is busy with the other bots now; timed with the next turn
+            with self.phase('gc'):
+                gc.collect()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Time a phase of the turn, e.g. ``with game.phase('plan'): ...``. Times are added to
+        :attr:`timings` and recorded with the turn. When tracing allocations, the memory allocated
+        by hlt code during the phase is added to :attr:`allocations`.
+
+        :param str name: The phase name
+        """
+        before = tracemalloc.take_snapshot().filter_traces(_HLT_TRACES) if self._trace_allocations else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+            if before is not None:
+                after = tracemalloc.take_snapshot().filter_traces(_HLT_TRACES)
+                self.allocations[name] = self.allocations.get(name, []) + after.compare_to(before, 'lineno')
+
+    def allocation_report(self, limit=10):
+        """
+        Summarize :attr:`allocations`.
+
+        :param int limit: Number of source lines listed per phase
+        :return: The source lines that allocated the most in each phase, largest first
+        :rtype: str
+        """
+        lines = []
+        for name, differences in self.allocations.items():
+            differences = sorted(differences, key=lambda difference: difference.size_diff, reverse=True)
+            lines.append("{}: {} bytes".format(name, sum(difference.size_diff for difference in differences)))
+            lines.extend("    {}".format(difference) for difference in differences[:limit])
+        return '\n'.join(lines)
 
     @staticmethod
     def _set_up_logging(tag, name):
@@ -70,20 +165,59 @@ class Game:
             format='%(created)f - %(message)s')
         logging.info("Initialized bot {}".format(name))
 
-    def __init__(self, name):
+    def __init__(self, name, history_size=16, warm_up=(), warm_up_budget=constants.WARM_UP_BUDGET, record_to=None,
+                 transport=None, manage_gc=False, trace_allocations=False, lazy_parse=False):
         """
         Initialize the bot with the given name.
 
+        The engine waits for the bot's name after sending the initial map, so the warm-up hooks run
+        in between, inside the engine's initialization time allowance.
+
         :param name: The name of the bot.
+        :param int history_size: Number of past turns kept in :attr:`history`
+        :param warm_up: Callables hook(game_map, deadline) run on the initial map before the name is sent.
+            deadline is a time.perf_counter() value hooks should stop by.
+        :param float warm_up_budget: Seconds after start-up by which the warm-up hooks must finish
+        :param str record_to: File to record every turn to (see :mod:`hlt.recorder`), if any.
+            ``{tag}`` is replaced by the player tag.
+        :param transport: Where to read the engine's input from and write commands to; standard input and
+            output by default (see :class:`StdioTransport`)
+        :param bool manage_gc: Take garbage collection out of the turns: after initialization the
+            surviving objects are frozen (gc.freeze) and automatic collection is disabled; instead
+            a collection runs after each command queue is sent, while the engine waits on the others.
+        :param bool trace_allocations: Trace the memory hlt code allocates in each phase (with
+            tracemalloc, which slows everything down) and log :meth:`allocation_report` every turn
+        :param bool lazy_parse: Parse each frame into numeric arrays only, and build the ship, planet
+            and player objects the bot asks for on demand (see :class:`game_map.Map`)
         """
+        deadline = time.perf_counter() + warm_up_budget
+        self._transport = StdioTransport() if transport is None else transport
         tag = int(self._get_string())
         Game._set_up_logging(tag, name)
         width, height = [int(x) for x in self._get_string().strip().split()]
-        self._send_string(name)
-        self._done_sending()
-        self.map = game_map.Map(tag, width, height)
+        self.map = game_map.Map(tag, width, height, lazy=lazy_parse)
+        self.timings = {}
+        self.allocations = {}
+        self._manage_gc = manage_gc
+        self._trace_allocations = trace_allocations
+        if trace_allocations:
+            tracemalloc.start()
+        self._recorder = recorder.TurnRecorder(
+            record_to.format(tag=tag), tag, width, height) if record_to else None
+        self.turn = -1
+        self.history = history.TurnHistory(history_size)
         self.update_map()
         self.initial_map = copy.deepcopy(self.map)
+        with self.phase('warm_up'):
+            warmup.run(warm_up, self.map, deadline)
+        self._send_string(name)
+        self._done_sending()
+        if manage_gc:
+            # the maps, caches and modules set up so far live all game: stop scanning them
+            gc.collect()
+            gc.freeze()
+            gc.disable()
+        self._end_turn([])
 
     def update_map(self):
         """
@@ -91,8 +225,22 @@ class Game:
         
         :return: new parsed map
         :rtype: game_map.Map
+        :raises GameOver: When the game has ended
         """
         import logging
         logging.info("---NEW TURN---")
-        self.map._parse(self._get_string())
+        try:
+            line = self._get_string()
+        except GameOver:
+            if self._recorder is not None:
+                self._recorder.close()
+            if self._manage_gc:
+                # leave the process as we found it, for in-process engines
+                gc.unfreeze()
+                gc.enable()
+            raise
+        with self.phase('parse'):
+            self.map._parse(line)
+            self.turn += 1
+            self.history.record(self.turn, self.map)
         return self.map
@@ -0,0 +1,128 @@
+"""
+Binary per-turn recorder for post-game analysis.
+
+Each turn's ship and planet arrays (see :mod:`hlt.arrays`), the commands sent and the
+per-phase timings are appended to a binary file with one write per turn. :func:`load`
+reopens a recording as arrays that are views into a memory map, without any parsing.
+
+File layout: a header (magic, player id, map width and height), then one record per turn:
+a fixed-size record header, the ship rows, the planet rows and the timings as float64,
+then the commands and phase names as newline-separated UTF-8, padded to 8 bytes.
+"""
+import collections
+import struct
+
+import numpy as np
+
+from . import arrays
+
+MAGIC = b'HLTREC01'
+FILE_HEADER = struct.Struct('<8siii4x')
+# turn, ships, planets, timings, command bytes, phase name bytes
+RECORD_HEADER = struct.Struct('<iiiiii')
+
+#: One recorded turn; ships and planets are arrays with the hlt.arrays columns
+TurnRecord = collections.namedtuple('TurnRecord', 'turn ships planets commands timings')
+#: A whole recorded game
+Recording = collections.namedtuple('Recording', 'my_id width height turns')
+
+
+def _padding(size):
+    return -size % 8
+
+
+class TurnRecorder:
+    """
+    Appends turns to a recording file. The record is assembled in a reusable buffer and
+    written with a single call, so recording costs a few copies per turn.
+    """
+
+    def __init__(self, path, my_id, width, height):
+        """
+        :param str path: The file to write (truncated)
+        :param int my_id: Our player id
+        :param int width: Map width
+        :param int height: Map height
+        """
+        # unbuffered, so each turn is one write straight to the file
+        self._file = open(path, 'wb', buffering=0)
+        self._file.write(FILE_HEADER.pack(MAGIC, my_id, width, height))
+        self._buffer = bytearray(1 << 16)
+
+    def record(self, turn, ships, planets, commands, timings):
+        """
+        Append one turn.
+
+        :param int turn: The turn number
+        :param np.ndarray ships: Ship rows
+        :param np.ndarray planets: Planet rows
+        :param list[str] commands: The commands sent this turn
+        :param dict[str, float] timings: Seconds spent per phase this turn
+        :return: nothing
+        """
+        command_bytes = '\n'.join(commands).encode()
+        name_bytes = '\n'.join(timings).encode()
+        ship_bytes = len(ships) * arrays.SHIP_COLUMNS * 8
+        planet_bytes = len(planets) * arrays.PLANET_COLUMNS * 8
+        text_bytes = len(command_bytes) + len(name_bytes)
+        size = (RECORD_HEADER.size + ship_bytes + planet_bytes + 8 * len(timings) + text_bytes)
+        size += _padding(size)
+        if size > len(self._buffer):
+            self._buffer = bytearray(max(size, 2 * len(self._buffer)))
+
+        buffer = self._buffer
+        RECORD_HEADER.pack_into(buffer, 0, turn, len(ships), len(planets), len(timings),
+                                len(command_bytes), len(name_bytes))
+        offset = RECORD_HEADER.size
+        for block in (ships, planets, np.fromiter(timings.values(), float, len(timings))):
+            view = np.frombuffer(buffer, np.float64, block.size, offset)
+            view[:] = block.ravel()
+            offset += block.size * 8
+        buffer[offset:offset + len(command_bytes)] = command_bytes
+        offset += len(command_bytes)
+        buffer[offset:offset + len(name_bytes)] = name_bytes
+        offset += len(name_bytes)
+        buffer[offset:size] = bytes(size - offset)
+        self._file.write(memoryview(buffer)[:size])
+
+    def close(self):
+        """
+        Flush and close the file.
+        """
+        self._file.close()
+
+
+def load(path):
+    """
+    Open a recording. Arrays are read-only views into a memory map of the file.
+
+    :param str path: The recording file
+    :return: The recorded game
+    :rtype: Recording
+    """
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    magic, my_id, width, height = FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("{} is not a turn recording".format(path))
+
+    turns = []
+    offset = FILE_HEADER.size
+    while offset < len(data):
+        turn, num_ships, num_planets, num_timings, command_bytes, name_bytes = \
+            RECORD_HEADER.unpack_from(data, offset)
+        start = offset
+        offset += RECORD_HEADER.size
+        blocks = []
+        for rows, columns in ((num_ships, arrays.SHIP_COLUMNS), (num_planets, arrays.PLANET_COLUMNS),
+                              (num_timings, 1)):
+            blocks.append(np.frombuffer(data, np.float64, rows * columns, offset).reshape(rows, columns))
+            offset += rows * columns * 8
+        commands = bytes(data[offset:offset + command_bytes]).decode()
+        offset += command_bytes
+        names = bytes(data[offset:offset + name_bytes]).decode()
+        offset += name_bytes
+        offset += _padding(offset - start)
+
+        turns.append(TurnRecord(turn, blocks[0], blocks[1], commands.split('\n') if commands else [],
+                                dict(zip(names.split('\n'), blocks[2][:, 0].tolist())) if names else {}))
+    return Recording(my_id, width, height, turns)
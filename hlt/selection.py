@@ -0,0 +1,204 @@
+"""
+Self-calibrating choice between implementations of the map queries.
+
+Obstacle checks (:meth:`game_map.Map.obstacles_between`), neighbour searches
+(:meth:`game_map.Map.entities_within`), proximity between two sets of entities
+(:func:`distances.within`) and moving collision tests (:meth:`game_map.Map.moving_collisions`)
+each come as a plain Python loop, a vectorized NumPy version and a KD-tree version. Which is
+fastest depends on the number of entities and on the host: :func:`calibrate` times all of them
+on maps of increasing size during the warm-up, and every call then picks the fastest for the
+current count from those measurements. Choices are made once per query and power-of-two
+range of counts, and reused until new measurements come in, so picking costs a dictionary
+lookup. Until calibrated, fixed crossover counts are used.
+Measurements are kept by an :class:`AlgorithmSelector` owned by each map (``game_map.selector``),
+so games, maps and tests in one process don't share them.
+"""
+import collections
+import logging
+import math
+import time
+
+import numpy as np
+
+from . import arrays, constants
+
+ALGORITHMS = ('loop', 'vectorized', 'kdtree')
+QUERIES = ('obstacles', 'neighbours', 'proximity', 'collisions')
+# (largest count, algorithm) used until calibrated
+DEFAULT_CROSSOVERS = ((24, 'loop'), (400, 'vectorized'), (math.inf, 'kdtree'))
+# number of ships of the maps timed by calibrate
+CALIBRATION_SIZES = (8, 32, 128, 512, 1024)
+
+
+def default_choice(count, crossovers=DEFAULT_CROSSOVERS):
+    """
+    :param int count: The number of entities a query will run on
+    :param crossovers: (largest count, algorithm) pairs, in increasing count
+    :return: The algorithm the crossovers pick for count
+    :rtype: str
+    """
+    return next(algorithm for (largest, algorithm) in crossovers if count <= largest)
+
+
+def _by_algorithm():
+    # module level, so selectors can be pickled to worker processes
+    return collections.defaultdict(list)
+
+
+class AlgorithmSelector:
+    """
+    Picks the fastest implementation of each query for an entity count, from measured call times
+    """
+
+    def __init__(self, crossovers=DEFAULT_CROSSOVERS):
+        self.crossovers = crossovers
+        # maps query -> algorithm -> list of (count, seconds per call)
+        self._measurements = collections.defaultdict(_by_algorithm)
+        # maps (query, count bucket) -> algorithm picked from the measurements
+        self._choices = {}
+        # maps query -> last algorithm chosen
+        self._chosen = {}
+
+    def record(self, query, algorithm, count, seconds):
+        """
+        Add a measured call time.
+
+        :param str query: The query name
+        :param str algorithm: The implementation timed
+        :param int count: The number of entities it ran on
+        :param float seconds: The time per call
+        :return: nothing
+        """
+        self._measurements[query][algorithm].append((count, seconds))
+        self._choices.clear()
+
+    def estimate(self, query, algorithm, count):
+        """
+        :return: The time per call of the algorithm for count entities, interpolated between measurements
+            in log-log space (and held constant beyond them), or None if it was never measured
+        :rtype: float
+        """
+        measurements = sorted(self._measurements[query][algorithm]) if query in self._measurements else []
+        if not measurements:
+            return None
+        counts, seconds = np.log(np.array(measurements, dtype=float)).T
+        return float(np.exp(np.interp(math.log(max(count, 1)), counts, seconds)))
+
+    def choose(self, query, count):
+        """
+        Pick the algorithm for a query, logging (at debug level) whenever the choice changes.
+
+        :param str query: The query name
+        :param int count: The number of entities it will run on
+        :return: The name of the algorithm
+        :rtype: str
+        """
+        if query in self._measurements:
+            bucket = max(count, 1).bit_length()
+            algorithm = self._choices.get((query, bucket))
+            if algorithm is None:
+                algorithm = self._choices[(query, bucket)] = self._fastest(query, bucket)
+        else:
+            algorithm = default_choice(count, self.crossovers)
+        if self._chosen.get(query) != algorithm:
+            self._chosen[query] = algorithm
+            logging.debug("Using the {} {} query for {} entities".format(algorithm, query, count))
+        return algorithm
+
+    def _fastest(self, query, bucket):
+        """
+        :return: The algorithm estimated fastest at the geometric middle of the counts in
+            [2 ** (bucket - 1), 2 ** bucket), or by the crossovers if none was measured
+        """
+        count = 2 ** (bucket - 0.5)
+        estimates = {algorithm: self.estimate(query, algorithm, count) for algorithm in ALGORITHMS}
+        estimates = {algorithm: seconds for (algorithm, seconds) in estimates.items() if seconds is not None}
+        if not estimates:
+            return default_choice(count, self.crossovers)
+        return min(estimates, key=estimates.get)
+
+    def log_calibration(self):
+        """
+        Log the measured times, one line per query and count.
+        """
+        for query, by_algorithm in sorted(self._measurements.items()):
+            counts = sorted({count for measurements in by_algorithm.values() for (count, _) in measurements})
+            for count in counts:
+                logging.info("Calibrated {} for {} entities: {}".format(query, count, ", ".join(
+                    "{} {:.1f}us".format(algorithm, 1e6 * self.estimate(query, algorithm, count))
+                    for algorithm in ALGORITHMS if algorithm in by_algorithm)))
+
+
+def _random_ships(rng, num_ships, width, height, my_id):
+    ships = np.zeros((num_ships, arrays.SHIP_COLUMNS))
+    # half ours, half the enemy's
+    ships[:, arrays.SHIP_OWNER] = np.where(np.arange(num_ships) % 2 == 0, my_id, my_id + 1)
+    ships[:, arrays.SHIP_ID] = np.arange(num_ships)
+    ships[:, arrays.SHIP_X] = rng.uniform(0, width, num_ships)
+    ships[:, arrays.SHIP_Y] = rng.uniform(0, height, num_ships)
+    ships[:, arrays.SHIP_HEALTH] = constants.BASE_SHIP_HEALTH
+    ships[:, [arrays.SHIP_VEL_X, arrays.SHIP_VEL_Y]] = rng.uniform(-3, 3, (num_ships, 2))
+    ships[:, arrays.SHIP_PLANET] = arrays.NONE
+    return ships
+
+
+def _best_time(call, repeats, setup=None):
+    best = math.inf
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate(game_map, deadline=None, sizes=CALIBRATION_SIZES, repeats=3, target=None):
+    """
+    Time every implementation of every query on maps with the planets of the given map and
+    random ships, for each number of ships in sizes. Can be used as a warm-up hook; sizes not
+    reached by the deadline are skipped.
+
+    :param game_map.Map game_map: The map to take the size and planets from
+    :param float deadline: time.perf_counter() value to stop by
+    :param sizes: The numbers of ships to time
+    :param int repeats: Calls timed per measurement (the fastest is kept)
+    :param AlgorithmSelector target: The selector to record into, the map's by default
+    :return: nothing
+    """
+    from . import distances, entity
+
+    target = game_map.selector if target is None else target
+    rng = np.random.default_rng(0)
+    planets = game_map.planet_array()
+    for num_ships in sizes:
+        if deadline is not None and time.perf_counter() >= deadline:
+            logging.warning("Calibration stopped before {} ships".format(num_ships))
+            break
+        synthetic = type(game_map)(game_map.my_id, game_map.width, game_map.height)
+        synthetic._load_arrays(_random_ships(rng, num_ships, game_map.width, game_map.height, game_map.my_id),
+                               planets)
+        ships = synthetic.all_ships()
+        mine = synthetic.get_me().all_ships()
+        theirs = [ship for ship in ships if ship.owner is not synthetic.get_me()]
+        ship = mine[0]
+        destination = entity.Position(min(ship.x + 30, game_map.width), ship.y)
+        entities = len(ships) + len(planets)
+        benchmarks = {
+            'obstacles': (entities, lambda algorithm: synthetic.obstacles_between(
+                ship, destination, algorithm=algorithm)),
+            'neighbours': (entities, lambda algorithm: synthetic.entities_within(
+                ship, 2 * constants.MAX_SPEED, algorithm=algorithm)),
+            'proximity': (len(ships), lambda algorithm: distances.within(
+                mine, theirs, 6, algorithm=algorithm)),
+            'collisions': (len(ships), lambda algorithm: synthetic.moving_collisions(
+                ship, constants.MAX_SPEED, 0, algorithm=algorithm)),
+        }
+        for query, (count, call) in benchmarks.items():
+            for algorithm in ALGORITHMS:
+                # untimed, to warm up the code paths
+                call(algorithm)
+                # each timed call starts from a new distance table, so the shared arrays and KD-tree
+                # it builds are charged to it, as they are to the first query of a turn
+                target.record(query, algorithm, count, _best_time(lambda: call(algorithm), repeats, synthetic._link))
+    target.log_calibration()
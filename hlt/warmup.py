@@ -0,0 +1,62 @@
+"""
+Start-up warm-up.
+
+Between reading the initial map and sending the bot's name, the engine gives the bot
+time to initialize. Warm-up hooks use it to build static data and to run the hot code
+paths once, so the first real turns don't pay for cold caches and first-call overheads.
+"""
+import logging
+import time
+
+import numpy as np
+
+from . import arrays, collision
+
+
+def run(hooks, game_map, deadline):
+    """
+    Run the warm-up hooks in order, skipping the remaining ones once the deadline has passed.
+
+    :param hooks: Callables hook(game_map, deadline)
+    :param game_map.Map game_map: The initial map
+    :param float deadline: time.perf_counter() value to stop by
+    :return: The number of hooks run
+    :rtype: int
+    """
+    start = time.perf_counter()
+    ran = 0
+    for hook in hooks:
+        if time.perf_counter() >= deadline:
+            logging.warning("Warm-up deadline reached, skipping {} hooks".format(len(hooks) - ran))
+            break
+        hook_start = time.perf_counter()
+        hook(game_map, deadline)
+        ran += 1
+        logging.info("Warm-up {} took {:.3f}s".format(
+            getattr(hook, '__name__', hook), time.perf_counter() - hook_start))
+    logging.info("Warm-up took {:.3f}s".format(time.perf_counter() - start))
+    return ran
+
+
+def warm_kernels(game_map, deadline):
+    """
+    Run the collision and navigation kernels once over the initial map. Stops early at the deadline.
+
+    :param game_map.Map game_map: The initial map
+    :param float deadline: time.perf_counter() value to stop by
+    :return: nothing
+    """
+    ships = game_map.ship_array()
+    planets = game_map.planet_array()
+    positions = np.vstack((ships[:, [arrays.SHIP_X, arrays.SHIP_Y]],
+                           planets[:, [arrays.PLANET_X, arrays.PLANET_Y]]))
+    circles = np.hstack((positions, np.zeros((len(positions), 1))))
+    collision.intersect_segments_circles(np.hstack((positions, positions[::-1])), circles)
+    collision.swept_collisions(positions, np.zeros_like(positions), 0.5, positions, np.zeros_like(positions), 0.5)
+
+    for ship in game_map.get_me().all_ships():
+        for planet in game_map.all_planets():
+            if time.perf_counter() >= deadline:
+                return
+            game_map.obstacles_between(ship, ship.closest_point_to(planet))
+        game_map.moving_collisions(ship, 0.0, 0.0)
@@ -0,0 +1,244 @@
+"""
+Optional multi-process turn planning.
+
+Each turn the parsed map is flattened into shared memory (see hlt.arrays) and a pool
+of worker processes, started once during initialization, each plan the ships in one
+strip of the map. Workers rebuild their map from the shared arrays, so nothing is
+imported or parsed per turn. The main process merges the commands and drops the ones
+that conflict across strips.
+
+Ships are planned knowing only the targets of the ships in their own strip, so two strips
+can send more ships to a planet than one process would. Each worker plans with its own
+cross-turn state (the navigation cache and squads of a MyBot.BotState), which only ever
+sees the ships of that worker's strip and is never merged back into the main process.
+Docking slots are the exception: the main process sends its slot assignments to the
+workers each turn, then hands out the slots the workers chose in command order, planning
+again the ships whose slot a ship of another strip took first.
+"""
+import logging
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import hlt
+from hlt import arrays, constants
+
+# capacity of the shared buffers; turns with more entities are planned in-process
+MAX_SHIPS = 4096
+MAX_PLANETS = 128
+MAX_WORKERS = 8
+
+
+def available_cores():
+    """
+    Number of cores this process may run on
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def partition_ships(ships, parts):
+    """
+    Split ships into parts contiguous strips of the map, ordered by x
+    return a list of lists of ship ids
+    """
+    ordered = sorted(ships, key=lambda ship: ship.x)
+    bounds = np.linspace(0, len(ordered), parts + 1).astype(int)
+    return [[ship.id for ship in ordered[start:stop]] for (start, stop) in zip(bounds[:-1], bounds[1:])]
+
+
+def share_docking_slots(game_map, command_queue, claims, state, replan):
+    """
+    Give the ships the docking slots the workers sent them to, in command order, in the main
+    process's state. Ships whose slot an earlier ship already holds are planned again with
+    replan(ship, planet, game_map, state), which picks a slot that is still free.
+    return the commands, with those ships' commands replaced (or dropped if they can't move)
+    """
+    me = game_map.get_me()
+    slots = state.docking_slots
+    shared = []
+    for command in command_queue:
+        kind, ship_id, *_ = command.split()
+        ship = me.get_ship(int(ship_id))
+        claim = claims.get(ship.id)
+        if kind != 't' or claim is None:
+            # docking, or heading for something else than a planet
+            slots.release(ship)
+        elif not slots.claim(ship, *claim):
+            command = replan(ship, game_map.get_planet(claim[0]), game_map, state)
+            if command is None:
+                continue
+        shared.append(command)
+    return shared
+
+
+def resolve_conflicts(game_map, command_queue):
+    """
+    Drop commands that conflict with commands planned in other partitions:
+    dock commands beyond a planet's free docking spots, and thrusts that end
+    within two ship radii of the end point of an earlier thrust that was kept.
+    return the surviving commands, in order
+    """
+    me = game_map.get_me()
+    free_spots = {}
+    resolved = []
+    # end points of the thrusts kept so far
+    ends = []
+    for command in command_queue:
+        kind, ship_id, *params = command.split()
+        ship = me.get_ship(int(ship_id))
+        if kind == 'd':
+            planet = game_map.get_planet(int(params[0]))
+            free = free_spots.get(planet.id, planet.num_docking_spots - len(planet._docked_ship_ids))
+            if free <= 0:
+                continue
+            free_spots[planet.id] = free - 1
+        elif kind == 't':
+            speed, angle = int(params[0]), np.radians(int(params[1]))
+            end = (ship.x + speed * np.cos(angle), ship.y + speed * np.sin(angle))
+            # only the later ship of a clashing pair gives way
+            if ends and (np.hypot(*(np.array(ends) - end).T) < 2 * constants.SHIP_RADIUS).any():
+                continue
+            ends.append(end)
+        resolved.append(command)
+    return resolved
+
+
+def _worker(conn, ship_buffer, planet_buffer, my_id, width, height, selector, plan, new_state):
+    """
+    Worker process main loop: wait for a partition, rebuild the map from shared memory, plan it
+    and send back the commands and the docking slots given out
+    """
+    ship_memory = shared_memory.SharedMemory(name=ship_buffer)
+    planet_memory = shared_memory.SharedMemory(name=planet_buffer)
+    ships = np.ndarray((MAX_SHIPS, arrays.SHIP_COLUMNS), buffer=ship_memory.buf)
+    planets = np.ndarray((MAX_PLANETS, arrays.PLANET_COLUMNS), buffer=planet_memory.buf)
+    game_map = hlt.game_map.Map(my_id, width, height, selector=selector)
+    state = new_state()
+    try:
+        while True:
+            task = conn.recv()
+            if task is None:
+                break
+            num_ships, num_planets, player_ids, ship_ids, docking_slots = task
+            game_map._load_arrays(ships[:num_ships], planets[:num_planets], player_ids)
+            state.docking_slots.restore(docking_slots)
+            me = game_map.get_me()
+            commands = plan(game_map, [me.get_ship(ship_id) for ship_id in ship_ids], state)
+            conn.send((commands, state.docking_slots.assignments(ship_ids)))
+    finally:
+        del ships, planets
+        ship_memory.close()
+        planet_memory.close()
+
+
+class TurnPlanner:
+    """
+    Plan each turn's ships with plan(game_map, ships, state) -> commands, on a pool of worker
+    processes when more than one core is available, else in this process.
+
+    plan, new_state() (which makes a worker's state, with a docking_slots attribute) and
+    replan (see share_docking_slots) must be module level so they can be sent to the workers.
+    context is the multiprocessing context to start the workers with, the default one if None.
+    Call close() when done, or the workers and shared memory outlive the game.
+    """
+
+    def __init__(self, game_map, plan, new_state, replan, workers=None, context=None):
+        self.plan_ships = plan
+        self.replan = replan
+        self.workers = min(available_cores(), MAX_WORKERS) if workers is None else workers
+        self._processes = []
+        self._connections = []
+        if self.workers <= 1:
+            logging.info("Parallel planning disabled, planning in-process")
+            return
+
+        self._ship_memory = shared_memory.SharedMemory(
+            create=True, size=MAX_SHIPS * arrays.SHIP_COLUMNS * 8)
+        self._planet_memory = shared_memory.SharedMemory(
+            create=True, size=MAX_PLANETS * arrays.PLANET_COLUMNS * 8)
+        self._ships = np.ndarray((MAX_SHIPS, arrays.SHIP_COLUMNS), buffer=self._ship_memory.buf)
+        self._planets = np.ndarray((MAX_PLANETS, arrays.PLANET_COLUMNS), buffer=self._planet_memory.buf)
+
+        context = multiprocessing.get_context() if context is None else context
+        try:
+            for _ in range(self.workers):
+                parent_end, child_end = context.Pipe()
+                process = context.Process(
+                    target=_worker, daemon=True,
+                    args=(child_end, self._ship_memory.name, self._planet_memory.name,
+                          game_map.my_id, game_map.width, game_map.height, game_map.selector, plan, new_state))
+                process.start()
+                self._processes.append(process)
+                self._connections.append(parent_end)
+        except Exception:
+            logging.warning("Could not start the planning workers, planning in-process", exc_info=True)
+            for process in self._processes:
+                process.terminate()
+                process.join()
+            self._processes = []
+            self._connections = []
+            self._release_memory()
+            return
+        logging.info("Parallel planning on {} workers".format(self.workers))
+
+    def plan(self, game_map, state):
+        """
+        Plan all our undocked ships for this turn.
+
+        :param hlt.game_map.Map game_map: This turn's map
+        :param state: The caller's state: used in full when planning in-process, only for its
+            docking slots when planning on the workers
+        :return: The merged command queue
+        :rtype: list[str]
+        """
+        ships = [ship for ship in game_map.get_me().all_ships()
+                 if ship.docking_status == ship.DockingStatus.UNDOCKED]
+        # the map's rows, so a lazily parsed map builds no ships for the workers
+        ship_rows, planet_rows = game_map.frame_rows()
+        if (not self._processes or len(ships) < 2 or
+                len(ship_rows) > MAX_SHIPS or len(planet_rows) > MAX_PLANETS):
+            return self.plan_ships(game_map, ships, state)
+
+        game_map.ship_array(out=self._ships)
+        game_map.planet_array(out=self._planets)
+        player_ids = [player.id for player in game_map.all_players()]
+        partitions = partition_ships(ships, min(self.workers, len(ships)))
+        docking_slots = state.docking_slots.snapshot()
+        for conn, ship_ids in zip(self._connections, partitions):
+            conn.send((len(ship_rows), len(planet_rows), player_ids, ship_ids, docking_slots))
+
+        command_queue = []
+        claims = {}
+        for conn, _ in zip(self._connections, partitions):
+            commands, assigned = conn.recv()
+            command_queue.extend(commands)
+            claims.update(assigned)
+        state.docking_slots.start_turn(game_map)
+        command_queue = share_docking_slots(game_map, command_queue, claims, state, self.replan)
+        return resolve_conflicts(game_map, command_queue)
+
+    def close(self):
+        """
+        Stop the workers and release the shared memory.
+        """
+        if not self._processes:
+            return
+        for conn in self._connections:
+            conn.send(None)
+        for process in self._processes:
+            process.join()
+        self._processes = []
+        self._release_memory()
+
+    def _release_memory(self):
+        """
+        Free the shared memory.
+        """
+        del self._ships, self._planets
+        for memory in (self._ship_memory, self._planet_memory):
+            memory.close()
+            memory.unlink()
@@ -0,0 +1,149 @@
+import numpy as np
+from hlt import arrays, constants
+from hlt.entity import Ship
+
+FORECAST_HORIZON = 50
+# most ships docked at one planet that the spawn schedules leave room for
+MAX_PRODUCERS = 8
+
+
+class ProductionForecast:
+    """
+    Forecasts when and where every planet will spawn ships, for all planets at once.
+
+    Each planet keeps an absolute spawn schedule (turn of each upcoming spawn) computed from its
+    production and number of fully docked ships. Schedules are only recomputed for planets whose
+    owner or docked ships changed, whose production differs from the forecast, or whose schedule
+    is running out; the rest just age as turns pass.
+    """
+
+    def __init__(self, horizon=FORECAST_HORIZON):
+        self.horizon = horizon
+        self.turn = 0
+        self.planet_ids = np.empty(0, dtype=int)
+        self.owners = np.empty(0, dtype=int)
+        self.producers = np.empty(0, dtype=int)
+        self.spawn_points = np.empty((0, 2))
+        # planets x upcoming spawns, absolute turns (inf where there is none)
+        self.schedule = np.empty((0, 0))
+        # production each planet is forecast to have had when its schedule was computed
+        self._base_production = np.empty(0)
+        self._base_turn = np.empty(0, dtype=int)
+
+    def update(self, game_map, turn):
+        """
+        Bring the forecast up to date with the given turn's map
+        return the number of planets whose schedule was recomputed
+        """
+        self.turn = turn
+        ships, planets = game_map.frame_rows()
+        planets = planets[np.argsort(planets[:, arrays.PLANET_ID])]
+        planet_ids = planets[:, arrays.PLANET_ID].astype(int)
+        owners = np.where(planets[:, arrays.PLANET_OWNED] > 0, planets[:, arrays.PLANET_OWNER], arrays.NONE).astype(int)
+
+        docked = ships[:, arrays.SHIP_DOCKING_STATUS] == Ship.DockingStatus.DOCKED.value
+        docked_planets = ships[docked, arrays.SHIP_PLANET].astype(int)
+        size = max(planet_ids.max(initial=-1), docked_planets.max(initial=-1)) + 1
+        producers = np.bincount(docked_planets, minlength=size)[planet_ids]
+        production = planets[:, arrays.PLANET_CURRENT]
+        remaining = planets[:, arrays.PLANET_REMAINING]
+
+        # carry over the previous rows of planets that still exist
+        known = np.zeros(len(planet_ids), dtype=bool)
+        previous = np.zeros(len(planet_ids), dtype=int)
+        if len(self.planet_ids):
+            previous = np.minimum(np.searchsorted(self.planet_ids, planet_ids), len(self.planet_ids) - 1)
+            known = self.planet_ids[previous] == planet_ids
+
+        columns = self._columns()
+        schedule = np.full((len(planet_ids), columns), np.inf)
+        base_production = np.zeros(len(planet_ids))
+        base_turn = np.full(len(planet_ids), turn)
+        rate = producers * float(constants.BASE_PRODUCTIVITY)
+        stale = ~known
+        if known.any():
+            rows = previous[known]
+            schedule[known] = self.schedule[rows]
+            base_production[known] = self._base_production[rows]
+            base_turn[known] = self._base_turn[rows]
+            expected = self._expected_production(base_production[known], rate[known], turn - base_turn[known])
+            stale[known] = ((self.owners[rows] != owners[known]) | (self.producers[rows] != producers[known]) |
+                            (np.abs(expected - production[known]) > 0.5) |
+                            # fewer than a horizon's worth of spawns left
+                            (schedule[known, -1] < turn + self.horizon))
+
+        if stale.any():
+            schedule[stale] = self._schedule(production[stale], rate[stale], remaining[stale], turn, columns)
+            base_production[stale] = production[stale]
+            base_turn[stale] = turn
+
+        self.planet_ids, self.owners, self.producers = planet_ids, owners, producers
+        self.schedule, self._base_production, self._base_turn = schedule, base_production, base_turn
+        self.spawn_points = self._spawn_points(planets, game_map.width, game_map.height)
+        return stale.sum()
+
+    def _columns(self):
+        # enough spawns for two horizons at the highest production rate
+        return int(np.ceil(2 * self.horizon * MAX_PRODUCERS * constants.BASE_PRODUCTIVITY /
+                           constants.PRODUCTION_PER_SHIP)) + 1
+
+    @staticmethod
+    def _expected_production(base, rate, elapsed):
+        """
+        Production expected after elapsed turns, after subtracting the ships spawned meanwhile
+        """
+        return (base + rate * elapsed) % constants.PRODUCTION_PER_SHIP
+
+    @staticmethod
+    def _schedule(production, rate, remaining, turn, columns):
+        """
+        Absolute turns of the next spawns for planets with the given production and rate.
+        Remaining resources cap the total when the engine reports them (it sends 0 otherwise).
+        """
+        spawn = np.arange(1, columns + 1)
+        needed = spawn[np.newaxis, :] * constants.PRODUCTION_PER_SHIP - production[:, np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            turns = turn + np.ceil(needed / rate[:, np.newaxis])
+        affordable = (remaining[:, np.newaxis] <= 0) | (needed <= remaining[:, np.newaxis])
+        return np.where((rate[:, np.newaxis] > 0) & affordable, turns, np.inf)
+
+    @staticmethod
+    def _spawn_points(planets, width, height):
+        """
+        Ships spawn SPAWN_RADIUS off the planet's surface on the side facing the map centre
+        """
+        centres = planets[:, [arrays.PLANET_X, arrays.PLANET_Y]]
+        towards = np.array([width / 2, height / 2]) - centres
+        length = np.linalg.norm(towards, axis=1, keepdims=True)
+        direction = np.divide(towards, length, out=np.tile([1.0, 0.0], (len(centres), 1)), where=length > 0)
+        distance = planets[:, [arrays.PLANET_RADIUS]] + constants.SPAWN_RADIUS
+        return centres + direction * distance
+
+    def spawns(self, horizon=None):
+        """
+        Forecast spawns within the horizon
+        return arrays of planet ids, owners, turns and spawn positions (N x 2), one entry per spawn
+        """
+        horizon = self.horizon if horizon is None else horizon
+        rows, spawn = np.nonzero((self.schedule > self.turn) & (self.schedule <= self.turn + horizon))
+        return (self.planet_ids[rows], self.owners[rows], self.schedule[rows, spawn].astype(int),
+                self.spawn_points[rows])
+
+    def fleet_counts(self, game_map, horizon=None):
+        """
+        Forecast each player's ship count for every turn of the horizon (ignoring losses)
+        return the player ids, and a players x (horizon + 1) array of counts, column 0 being now
+        """
+        horizon = self.horizon if horizon is None else horizon
+        players = sorted(game_map.all_players(), key=lambda player: player.id)
+        player_ids = np.array([player.id for player in players], dtype=int)
+        # counted from the rows, so a lazily parsed map builds no ships
+        ships, _ = game_map.frame_rows()
+        owners = ships[:, arrays.SHIP_OWNER].astype(int)
+        current = np.array([np.count_nonzero(owners == player_id) for player_id in player_ids], dtype=int)
+
+        _, owners, turns, _ = self.spawns(horizon)
+        owned = np.isin(owners, player_ids)
+        new = np.zeros((len(players), horizon + 1), dtype=int)
+        np.add.at(new, (np.searchsorted(player_ids, owners[owned]), turns[owned] - self.turn), 1)
+        return player_ids, current[:, np.newaxis] + np.cumsum(new, axis=1)
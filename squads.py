@@ -0,0 +1,97 @@
+import collections
+import numpy as np
+import scipy.sparse
+import scipy.sparse.csgraph
+from hlt import entity
+
+# ships in the same or neighbouring grid cells of this size are in the same squad
+SQUAD_CELL_SIZE = 4.0
+
+
+def grid_clusters(positions, cell_size=SQUAD_CELL_SIZE):
+    """
+    Cluster positions by snapping them to a grid and joining occupied cells that touch
+    (including diagonally). Neighbouring cells are found by binary search over the sorted
+    occupied cells, so the cost grows with the number of occupied cells, not pairs of ships or cells
+    return an array with a cluster label for each position
+    """
+    if len(positions) == 0:
+        return np.empty(0, dtype=int)
+    cells = np.floor(np.asarray(positions) / cell_size).astype(int)
+    cells -= cells.min(axis=0) - 1
+    # one integer per cell, x major, with a free row on either side so y + 1 and y - 1 never wrap
+    span = cells[:, 1].max() + 2
+    occupied, cell_of = np.unique(cells[:, 0] * span + cells[:, 1], return_inverse=True)
+    sources, targets = [], []
+    # the neighbours above and to the right; the other half are found from the other side
+    for offset in (1, span - 1, span, span + 1):
+        neighbours = occupied + offset
+        found = np.minimum(np.searchsorted(occupied, neighbours), len(occupied) - 1)
+        touching = occupied[found] == neighbours
+        sources.append(np.flatnonzero(touching))
+        targets.append(found[touching])
+    sources, targets = np.concatenate(sources), np.concatenate(targets)
+    graph = scipy.sparse.coo_matrix((np.ones(len(sources)), (sources, targets)), shape=(len(occupied),) * 2)
+    _, labels = scipy.sparse.csgraph.connected_components(graph, directed=False)
+    return labels[cell_of.ravel()]
+
+
+class Squad:
+    """
+    A group of our ships planned as one: a leader plans the route, the rest keep their offset from it
+    """
+
+    def __init__(self, squad_id, ships):
+        self.id = squad_id
+        self.ships = ships
+        positions = np.array([[ship.x, ship.y] for ship in ships])
+        self.centroid = entity.Position(*positions.mean(axis=0))
+        # the leader is the ship nearest the centroid
+        self.leader = ships[int(np.argmin(np.linalg.norm(positions - [self.centroid.x, self.centroid.y], axis=1)))]
+
+    def __len__(self):
+        return len(self.ships)
+
+    def __repr__(self):
+        return "Squad {} of {} ships led by {}".format(self.id, len(self.ships), self.leader.id)
+
+
+class SquadTracker:
+    """
+    Clusters ships into squads each turn, keeping squad ids stable across turns:
+    each new cluster takes the id of the previous squad most of its ships were in.
+    Moving ships change grid cells nearly every turn, so membership is recomputed from
+    scratch each turn rather than patched; the clustering is linear in the occupied cells
+    """
+
+    def __init__(self, cell_size=SQUAD_CELL_SIZE):
+        self.cell_size = cell_size
+        # maps ship ids -> squad id last turn
+        self._squad_of = {}
+        self._next_id = 0
+
+    def update(self, ships):
+        """
+        Re-cluster the given ships
+        return list of Squads, largest first
+        """
+        labels = grid_clusters([[ship.x, ship.y] for ship in ships], self.cell_size)
+        clusters = collections.defaultdict(list)
+        for label, ship in zip(labels.tolist(), ships):
+            clusters[label].append(ship)
+
+        # larger clusters get first pick of previous ids
+        squads = []
+        claimed = set()
+        for members in sorted(clusters.values(), key=len, reverse=True):
+            previous = collections.Counter(
+                self._squad_of[ship.id] for ship in members if ship.id in self._squad_of)
+            squad_id = next((squad_id for (squad_id, _) in previous.most_common() if squad_id not in claimed), None)
+            if squad_id is None:
+                squad_id = self._next_id
+                self._next_id += 1
+            claimed.add(squad_id)
+            squads.append(Squad(squad_id, members))
+
+        self._squad_of = {ship.id: squad.id for squad in squads for ship in squad.ships}
+        return squads
@@ -0,0 +1,43 @@
+import contextlib
+import hlt
+import MyBot
+import batch_eval
+from test_parallel_planning import make_map
+
+
+def test_play_turn_keeps_state_across_turns():
+    state = MyBot.BotState()
+    timings = []
+    commands = MyBot.play_turn(make_map(), state, phase=lambda name: timings.append(name) or contextlib.nullcontext())
+    assert state.turn == 1
+    assert commands
+    assert timings == ['forecast', 'plan']
+    assert set(state.docking_slots._assigned) <= {0, 1, 2}
+    MyBot.play_turn(make_map(), state)
+    assert state.turn == 2
+
+
+def test_recorded_game_is_played_in_order(tmp_path):
+    game_map = make_map()
+    path = str(tmp_path / "game.rec")
+    recorder = hlt.recorder.TurnRecorder(path, 0, 120, 100)
+    for turn in range(3):
+        recorder.record(turn, game_map.ship_array(), game_map.planet_array(), [], {})
+    recorder.close()
+
+    frames = batch_eval.load_game(path)
+    assert len(frames) == 3
+    assert frames[0].player_ids == [0, 1]
+    evaluation = batch_eval.evaluate([frames])
+    assert evaluation.turns == 3
+    assert len(evaluation.commands[0]) == 3
+
+
+def test_pool_plays_the_same_ships():
+    games = batch_eval.generate_games(4, turns=2, ships_per_player=5)
+    local = batch_eval.evaluate(games)
+    pooled = batch_eval.evaluate(games, workers=2)
+    assert pooled.turns == local.turns == 8
+    ship_ids = lambda evaluation: [[sorted(command.split()[1] for command in turn) for turn in game]
+                                   for game in evaluation.commands]
+    assert ship_ids(pooled) == ship_ids(local)
@@ -0,0 +1,32 @@
+import numpy
+from hlt import collision
+from hlt.entity import Position, Entity
+
+
+def test_intersect_segments_circles_matches_scalar_version():
+    rng = numpy.random.RandomState(0)
+    segments = rng.uniform(0, 20, (30, 4))
+    segments[0, 2:4] = segments[0, 0:2]
+    circles = numpy.hstack((rng.uniform(0, 20, (40, 2)), rng.uniform(0.5, 4, (40, 1))))
+
+    result = collision.intersect_segments_circles(segments, circles, fudge=0.6)
+
+    for row, (sx, sy, ex, ey) in enumerate(segments):
+        for col, (cx, cy, r) in enumerate(circles):
+            circle = Entity(cx, cy, r, 0, 0, 0)
+            assert result[row, col] == collision.intersect_segment_circle(
+                Position(sx, sy), Position(ex, ey), circle, fudge=0.6)
+
+
+def test_swept_collisions_catches_ships_passing_through_each_other():
+    positions = [[0, 0]]
+    velocities = [[7, 0]]
+    # crosses our path mid-turn, and one that is close at the start but flies away
+    other_positions = [[3.5, -3.5], [1, 1.5]]
+    other_velocities = [[0, 7], [0, 7]]
+
+    hits, t = collision.swept_collisions(positions, velocities, 0.5, other_positions, other_velocities, 0.5)
+
+    assert hits.tolist() == [[True, False]]
+    assert abs(t[0, 0] - 0.5) < 1e-9
+    assert t[0, 1] == 0
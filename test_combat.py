@@ -0,0 +1,90 @@
+import numpy
+import combat
+from hlt.entity import Ship
+
+
+def make_ships(owner, positions, first_id=0, health=255):
+    return [Ship(owner, first_id + n, x, y, health, 0, 0, Ship.DockingStatus.UNDOCKED, 0, 0, 0)
+            for (n, (x, y)) in enumerate(positions)]
+
+
+def test_clusters_only_contested_contacts():
+    mine = make_ships(0, ((0, 0), (1, 0), (100, 100)))
+    theirs = make_ships(1, ((5, 0), (200, 200), (201, 200)), first_id=10)
+    clusters = combat.contact_clusters(mine + theirs)
+
+    assert clusters.members.shape == (1, 3)
+    assert sorted(clusters.members[0].tolist()) == [0, 1, 3]
+
+
+def test_damage_is_split_between_targets_in_range():
+    mine = make_ships(0, ((0, 0),))
+    theirs = make_ships(1, ((3, 0), (3, 2)), first_id=10)
+    clusters = combat.contact_clusters(mine + theirs)
+
+    health = combat.simulate(clusters, clusters.mask[numpy.newaxis], turns=1)[0]
+
+    ours = clusters.members[0].tolist().index(0)
+    assert health[0, ours] == 255 - 2 * 64
+    assert sorted(health[0].tolist()) == [127, 223, 223]
+
+
+def test_ships_fire_on_consecutive_turns():
+    mine = make_ships(0, ((0, 0),))
+    theirs = make_ships(1, ((3, 0),), first_id=10)
+    clusters = combat.contact_clusters(mine + theirs)
+
+    healths = [combat.simulate(clusters, clusters.mask[numpy.newaxis], turns=turns)[0, 0].tolist()
+               for turns in range(1, 5)]
+    assert healths == [[191, 191], [127, 127], [63, 63], [0, 0]]
+
+
+def test_cooldown_reported_by_the_engine_has_run_out_by_the_next_turn():
+    mine = make_ships(0, ((0, 0),))
+    theirs = make_ships(1, ((3, 0),), first_id=10)
+    mine[0]._weapon_cooldown = 1
+    clusters = combat.contact_clusters(mine + theirs)
+
+    health = combat.simulate(clusters, clusters.mask[numpy.newaxis], turns=1)[0]
+    assert health[0].tolist() == [191, 191]
+
+
+def test_engage_when_outnumbering_retreat_when_outnumbered():
+    mine = make_ships(0, ((0, 0), (1, 1)))
+    theirs = make_ships(1, ((4, 0),), first_id=10)
+    plan = combat.plan_engagements(mine, mine + theirs)
+    assert plan == {mine[0]: theirs[0], mine[1]: theirs[0]}
+
+    theirs = make_ships(1, ((4, 0), (4, 1), (4, 2)), first_id=10)
+    plan = combat.plan_engagements(mine, mine + theirs)
+    assert plan == {mine[0]: None, mine[1]: None}
+
+
+def test_clusters_use_the_map_distance_table():
+    import batch_eval
+    import hlt
+    frame = batch_eval.generate_games(1, ships_per_player=30)[0][0]
+    game_map = hlt.game_map.Map(frame.my_id, frame.width, frame.height)
+    game_map._load_arrays(frame.ships, frame.planets, frame.player_ids)
+    ships = game_map.all_ships()
+    clusters = combat.contact_clusters(ships)
+    assert len(clusters.members)
+
+    table = game_map.distances.ship_distances()
+    assert 'ship_ship_distances' in game_map.distances._blocks
+    for members, mask, distances in zip(clusters.members, clusters.mask, clusters.distances):
+        rows = members[mask]
+        assert (distances[numpy.ix_(mask, mask)] == table[numpy.ix_(rows, rows)]).all()
+
+
+def test_map_engagements_match_lists():
+    import batch_eval
+    import hlt
+    frame = batch_eval.generate_games(1, ships_per_player=40)[0][0]
+    for lazy in (False, True):
+        game_map = hlt.game_map.Map(frame.my_id, frame.width, frame.height, lazy=lazy)
+        game_map._load_arrays(frame.ships, frame.planets, frame.player_ids)
+        mine = game_map.get_me().all_ships()
+        plan = combat.plan_map_engagements(mine, game_map)
+        assert plan
+        assert plan == combat.plan_engagements(mine, game_map.all_ships())
@@ -0,0 +1,43 @@
+import math
+import numpy as np
+import hlt
+from test_parallel_planning import FRAME, make_map
+
+
+def test_lookups_match_direct_computation():
+    game_map = make_map()
+    ships, planets = game_map.all_ships(), game_map.all_planets()
+    for ship in ships:
+        for other in ships + planets:
+            assert ship.calculate_distance_between(other) == math.sqrt(
+                (other.x - ship.x) ** 2 + (other.y - ship.y) ** 2)
+            assert np.isclose(ship.calculate_angle_between(other),
+                              math.degrees(math.atan2(other.y - ship.y, other.x - ship.x)) % 360)
+    assert planets[0].calculate_distance_between(ships[0]) == ships[0].calculate_distance_between(planets[0])
+    # both blocks were built once, for all pairs
+    assert game_map.distances.ship_distances().shape == (len(ships), len(ships))
+    assert game_map.distances.ship_planet_distances().shape == (len(ships), len(planets))
+
+
+def test_table_is_rebuilt_on_parse():
+    game_map = make_map()
+    old_ship = game_map.get_me().get_ship(0)
+    old_table = game_map.distances
+    game_map._parse(FRAME.replace("0 3 0 10 10", "0 3 0 12 10", 1))
+    new_ship = game_map.get_me().get_ship(0)
+    planet = game_map.get_planet(0)
+
+    assert game_map.distances is not old_table
+    assert new_ship.calculate_distance_between(planet) == math.hypot(50 - 12, 50 - 10)
+    # entities of the previous turn are no longer in the table
+    assert old_ship.calculate_distance_between(planet) == math.hypot(50 - 10, 50 - 10)
+
+
+def test_pairwise_falls_back_outside_the_map():
+    game_map = make_map()
+    ships = game_map.get_me().all_ships()
+    points = [hlt.entity.Position(0, 0), hlt.entity.Position(3, 4)]
+    assert np.allclose(hlt.distances.pairwise(ships[:1], points), [[math.hypot(10, 10), math.hypot(7, 6)]])
+    enemies = game_map.get_player(1).all_ships()
+    assert np.array_equal(hlt.distances.pairwise(ships, enemies),
+                          [[ship.calculate_distance_between(enemy) for enemy in enemies] for ship in ships])
@@ -0,0 +1,55 @@
+import numpy
+import hlt
+import docking
+
+# two ships of ours west of a planet with two spots, one of which is taken by a docked ship of ours
+FRAME = ("1 0 3 0 20 49 255 0 0 0 0 0 0 1 20 51 255 0 0 0 0 0 0 2 55 50 255 0 0 2 0 5 0 "
+         "1 0 50 50 1000 3 {} 0 1000 1 0 1 2")
+
+
+def make_map(spots=2):
+    game_map = hlt.game_map.Map(0, 100, 100)
+    game_map._parse(FRAME.format(spots))
+    return game_map
+
+
+def test_slot_points_are_evenly_spaced_inside_dock_radius():
+    planet = make_map(4).get_planet(0)
+    points = docking.slot_points(planet)
+    distances = numpy.linalg.norm(points - [planet.x, planet.y], axis=1)
+
+    assert numpy.allclose(distances, planet.radius + docking.DOCK_POINT_DISTANCE)
+    assert numpy.allclose(numpy.linalg.norm(points - numpy.roll(points, 1, axis=0), axis=1),
+                          numpy.linalg.norm(points[0] - points[1]))
+
+
+def test_ships_from_the_same_side_get_different_slots():
+    game_map = make_map(3)
+    slots = docking.DockingSlots()
+    slots.build(game_map)
+    slots.start_turn(game_map)
+    first, second = game_map.get_me().get_ship(0), game_map.get_me().get_ship(1)
+    planet = game_map.get_planet(0)
+
+    # the docked ship holds the east slot, the others are shared out and kept across calls
+    first_slot = slots.assign(first, planet)
+    second_slot = slots.assign(second, planet)
+    assert first_slot.x < 50 and second_slot.x < 50
+    assert first_slot.y != second_slot.y
+    assert slots.assign(first, planet).y == first_slot.y
+    assert slots.try_dock(first, planet)
+    assert slots.try_dock(second, planet)
+    assert not slots.try_dock(game_map.get_me().get_ship(2), planet)
+
+
+def test_full_planet_has_no_slots():
+    game_map = make_map(2)
+    slots = docking.DockingSlots()
+    slots.start_turn(game_map)
+    first, second = game_map.get_me().get_ship(0), game_map.get_me().get_ship(1)
+    planet = game_map.get_planet(0)
+
+    assert slots.assign(first, planet) is not None
+    assert slots.assign(second, planet) is None
+    slots.release(first)
+    assert slots.assign(second, planet) is not None
@@ -21,3 +21,27 @@ def test_enemy_ship_distances():
         }
 
     assert result == expectation
+
+
+def make_map(lazy=False):
+    import batch_eval
+    import hlt
+    frame = batch_eval.generate_games(1, ships_per_player=40)[0][0]
+    game_map = hlt.game_map.Map(frame.my_id, frame.width, frame.height, lazy=lazy)
+    game_map._load_arrays(frame.ships, frame.planets, frame.player_ids)
+    return game_map
+
+
+def test_map_enemy_distances_match_lists():
+    game_map = make_map()
+    mine = game_map.get_me().all_ships()
+    expectation = enemy_ships.check_enemy_distances(mine, game_map.all_ships(), threshold=20)
+    assert any(expectation.values())
+    assert enemy_ships.check_map_enemy_distances(mine, game_map, threshold=20) == expectation
+
+
+def test_map_enemy_distances_only_build_enemies_in_range():
+    game_map = make_map(lazy=True)
+    result = enemy_ships.check_map_enemy_distances(game_map.get_me().all_ships(), game_map, threshold=20)
+    in_range = {enemy.id for enemies in result.values() for enemy in enemies}
+    assert set(game_map.get_player(1)._ships._built) == in_range
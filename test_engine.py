@@ -0,0 +1,51 @@
+import hlt
+import MyBot
+
+FRAME = ("2 0 2 0 30 50 255 0 0 0 0 0 0 1 34 50 255 0 0 0 0 0 0 1 1 2 150 50 255 0 0 0 0 0 0 "
+         "1 0 40 50 2000 5 3 0 1000 0 0 0")
+
+
+def test_parse_commands_splits_concatenated_commands():
+    commands = hlt.engine.parse_commands("t 0 7 90d 1 3u 2t 4 0 355")
+    assert commands == [('t', 0, 7, 90), ('d', 1, 3), ('u', 2), ('t', 4, 0, 355)]
+
+
+def test_format_frame_round_trips():
+    engine = hlt.engine.LocalEngine.from_frame(FRAME, 0, 200, 100)
+    game_map = hlt.game_map.Map(0, 200, 100)
+    game_map._parse(engine.frame())
+    assert (game_map.ship_array() == engine.ships).all()
+    assert (game_map.planet_array() == engine.planets).all()
+
+
+def test_bot_plays_against_local_engine(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = hlt.engine.LocalEngine.from_frame(FRAME, 0, 200, 100, max_turns=12)
+    MyBot.main(engine.transport())
+
+    assert engine.turn == 12
+    assert len(engine.command_queues) == 12
+    assert any(kind == 'd' for kind, *_ in hlt.engine.parse_commands(''.join(engine.command_queues)))
+    # our ships moved and docked, the enemy ship never got commands
+    mine = engine.ships[engine.ships[:, hlt.arrays.SHIP_OWNER] == 0]
+    assert (mine[:, hlt.arrays.SHIP_DOCKING_STATUS] != 0).any()
+    assert engine.planets[0, hlt.arrays.PLANET_OWNER] == 0
+    enemy = engine.ships[engine.ships[:, hlt.arrays.SHIP_OWNER] == 1]
+    assert enemy[0, hlt.arrays.SHIP_X] == 150
+
+
+def test_games_in_one_process_start_from_a_fresh_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    states = []
+
+    class RecordedState(MyBot.BotState):
+        def __init__(self):
+            super().__init__()
+            states.append(self)
+
+    monkeypatch.setattr(MyBot, 'BotState', RecordedState)
+    for _ in range(2):
+        engine = hlt.engine.LocalEngine.from_frame(FRAME, 0, 200, 100, max_turns=6)
+        MyBot.main(engine.transport())
+    # warm-up planning runs on throwaway states that never play a turn
+    assert [state.turn for state in states if state.turn] == [6, 6]
@@ -0,0 +1,68 @@
+import math
+import hlt
+from test_parallel_planning import FRAME, make_map
+
+
+def make_lazy_map():
+    game_map = hlt.game_map.Map(0, 120, 100, lazy=True)
+    game_map._parse(FRAME)
+    return game_map
+
+
+def test_lazy_parse_matches_eager_parse():
+    eager, lazy = make_map(), make_lazy_map()
+
+    assert (lazy.ship_array() == eager.ship_array()).all()
+    assert (lazy.planet_array() == eager.planet_array()).all()
+    assert [ship.id for ship in lazy.all_ships()] == [ship.id for ship in eager.all_ships()]
+    assert str(lazy.get_planet(0)) == str(eager.get_planet(0))
+
+
+def test_lazy_entities_are_built_on_demand_and_cached():
+    game_map = make_lazy_map()
+    mine = game_map.get_me().all_ships()
+
+    assert game_map.get_me().get_ship(1) is mine[1]
+    assert mine[0].owner is game_map.get_me()
+    # nothing looked at the enemy's ships yet
+    assert len(game_map.get_player(1)._ships._built) == 0
+    assert mine[0].calculate_distance_between(game_map.get_planet(0)) == math.hypot(50 - 10, 50 - 10)
+
+    planet = game_map.get_planet(1)
+    docked = planet.all_docked_ships()
+    assert [ship.id for ship in docked] == [10]
+    assert docked[0].planet is planet
+    assert docked[0] is game_map.get_player(1).get_ship(10)
+
+
+def query_ids(game_map, algorithm):
+    ship = game_map.get_me().get_ship(0)
+    return ([entity.id for entity in game_map.entities_within(ship, 20, algorithm=algorithm)],
+            [entity.id for entity in game_map.obstacles_between(
+                ship, game_map.get_player(1).get_ship(10), algorithm=algorithm)],
+            [other.id for other in game_map.moving_collisions(ship, 7, 0, fudge=10, algorithm=algorithm)])
+
+
+def test_lazy_queries_match_eager_queries():
+    eager, lazy = make_map(), make_lazy_map()
+    for algorithm in hlt.selection.ALGORITHMS:
+        assert query_ids(lazy, algorithm) == query_ids(eager, algorithm)
+
+
+def test_arrays_are_fresh_in_both_modes():
+    for game_map in (make_map(), make_lazy_map()):
+        ships = game_map.ship_array()
+        ships[:, hlt.arrays.SHIP_X] += 1
+        assert game_map.get_me().get_ship(0).x == 10
+        assert (game_map.ship_array()[:, hlt.arrays.SHIP_X] == ships[:, hlt.arrays.SHIP_X] - 1).all()
+        assert game_map.planet_array().flags.writeable
+
+
+def test_rows_are_built_once_per_parse():
+    for game_map in (make_map(), make_lazy_map()):
+        ships, planets = game_map.frame_rows()
+        assert game_map.frame_rows()[0] is ships
+        assert not ships.flags.writeable and not planets.flags.writeable
+        assert (game_map.ship_array() == ships).all()
+        game_map._load_arrays(ships, planets[:1])
+        assert len(game_map.frame_rows()[1]) == 1
@@ -0,0 +1,36 @@
+import numpy as np
+import hlt
+from test_parallel_planning import make_map
+
+
+def test_batched_helpers_match_entity_methods():
+    game_map = make_map()
+    ships = game_map.all_ships()
+    planets = game_map.all_planets()
+    ship_positions = hlt.geometry.positions(ships)
+    planet_circles = hlt.geometry.circles(planets)
+
+    angles = hlt.geometry.angles_between(ship_positions, planet_circles)
+    points = hlt.geometry.closest_points(ship_positions, planet_circles)
+    dockable = hlt.geometry.can_dock(ship_positions, planet_circles)
+    for i, ship in enumerate(ships):
+        for j, planet in enumerate(planets):
+            assert np.isclose(angles[i, j], ship.calculate_angle_between(planet))
+            point = ship.closest_point_to(planet)
+            assert np.allclose(points[i, j], [point.x, point.y])
+            assert dockable[i, j] == ship.can_dock(planet)
+
+
+def test_closest_point_from_the_target_centre():
+    points = hlt.geometry.closest_points([[10, 10]], [[10, 10, 2]], min_distance=1)
+    assert np.allclose(points, [[[13, 10]]])
+
+
+def test_commands_match_ship_commands():
+    game_map = make_map()
+    ships = game_map.get_me().all_ships()
+    magnitudes, angles = [7, 3.9, 0], [90.4, 359.5, 12.5]
+    assert hlt.geometry.thrust_commands([ship.id for ship in ships], magnitudes, angles) == [
+        ship.thrust(magnitude, angle) for (ship, magnitude, angle) in zip(ships, magnitudes, angles)]
+    planet = game_map.get_planet(0)
+    assert hlt.geometry.dock_commands([0, 1], [0, 0]) == [ships[0].dock(planet), ships[1].dock(planet)]
@@ -0,0 +1,44 @@
+import numpy
+import hlt
+
+
+def frame(turn):
+    # ship 0 flies east 2 per turn and loses 10 health per turn, ship 1 only exists on even turns;
+    # planet 0 is taken by player 0 on turn 3
+    ships = ["0 {} 10 {} 0 0 0 0 0 0".format(10 + 2 * turn, 255 - 10 * turn)]
+    if turn % 2 == 0:
+        ships.append("1 50 50 255 0 0 0 0 0 0")
+    owned = "1 0" if turn >= 3 else "0 0"
+    return "1 0 {} {} 1 0 30 30 1000 5 3 0 1000 {} 0".format(len(ships), " ".join(ships), owned)
+
+
+def test_ring_buffer_keeps_only_the_last_turns():
+    history = hlt.history.TurnHistory(capacity=4, max_ships=8, max_planets=4)
+    game_map = hlt.game_map.Map(0, 100, 100)
+    for turn in range(7):
+        game_map._parse(frame(turn))
+        history.record(turn, game_map)
+
+    assert history.turns().tolist() == [3, 4, 5, 6]
+    assert history.ship_positions(0)[:, 0].tolist() == [16, 18, 20, 22]
+    assert numpy.isnan(history.ship_positions(1)[[0, 2], 0]).all()
+    assert abs(history.health_trend(0) + 10) < 1e-9
+
+    ids, velocities = history.estimated_velocities()
+    assert ids.tolist() == [0]
+    assert velocities.tolist() == [[2, 0]]
+
+    planet_ids, owners = history.planet_owners()
+    assert planet_ids.tolist() == [0]
+    assert owners[:, 0].tolist() == [0, 0, 0, 0]
+
+
+def test_ships_beyond_capacity_are_dropped():
+    history = hlt.history.TurnHistory(capacity=2, max_ships=1, max_planets=4)
+    game_map = hlt.game_map.Map(0, 100, 100)
+    game_map._parse(frame(0))
+    history.record(0, game_map)
+
+    ships, planets = history.latest()
+    assert ships[:, hlt.arrays.SHIP_ID].tolist() == [0]
+    assert len(planets) == 1
@@ -0,0 +1,49 @@
+import hlt
+from hlt.entity import Position
+
+# one ship of ours heading east past a planet, and an enemy ship far away
+FRAME = ("2 "
+         "0 1 0 10 50 255 0 0 0 0 0 0 "
+         "1 1 1 100 90 255 0 0 0 0 0 0 "
+         "1 "
+         "0 20 50 1000 3 2 0 1000 0 0 0")
+
+
+def make_map(frame=FRAME):
+    game_map = hlt.game_map.Map(0, 120, 100)
+    game_map._parse(frame)
+    return game_map
+
+
+def test_cache_reuses_heading_until_obstacles_change():
+    cache = hlt.navigation.NavigationCache()
+    game_map = make_map()
+    ship = game_map.get_me().get_ship(0)
+    target = Position(40, 50)
+
+    first = ship.navigate(target, game_map, 7, angular_step=2, cache=cache)
+    # the planet blocks the direct heading
+    assert first != "t 0 7 0"
+    assert ship.navigate(target, game_map, 7, angular_step=2, cache=cache) == first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # an enemy ship appears on the cached heading
+    game_map = make_map(FRAME.replace("1 100 90", "1 14 52"))
+    ship = game_map.get_me().get_ship(0)
+    assert ship.navigate(target, game_map, 7, angular_step=2, cache=cache) != first
+    assert (cache.hits, cache.misses, cache.invalidations) == (1, 2, 0)
+    assert cache.hit_rate() == 1 / 3
+
+    # the planet is gone, so the direct heading is clear again
+    game_map = make_map(FRAME.replace("0 20 50 1000 3", "0 20 90 1000 3"))
+    ship = game_map.get_me().get_ship(0)
+    assert ship.navigate(target, game_map, 7, angular_step=2, cache=cache) == "t 0 7 0"
+    assert (cache.hits, cache.misses, cache.invalidations) == (1, 3, 1)
+
+
+def test_cache_keeps_no_entry_for_clear_paths():
+    cache = hlt.navigation.NavigationCache()
+    game_map = make_map()
+    ship = game_map.get_me().get_ship(0)
+    assert ship.navigate(Position(10, 20), game_map, 7, cache=cache) == "t 0 7 270"
+    assert cache._entries == {}
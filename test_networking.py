@@ -0,0 +1,69 @@
+import gc
+import tracemalloc
+import hlt
+from test_engine import FRAME
+
+
+def test_gc_is_collected_between_turns(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = hlt.engine.LocalEngine.from_frame(FRAME, 0, 200, 100, max_turns=3)
+    game = hlt.Game("Test", transport=engine.transport(), manage_gc=True)
+    try:
+        assert not gc.isenabled()
+        assert gc.get_freeze_count() > 0
+        game.update_map()
+        game.send_command_queue([])
+        assert 'gc' in game.timings
+        for _ in range(2):
+            game.update_map()
+            game.send_command_queue([])
+        try:
+            game.update_map()
+        except hlt.networking.GameOver:
+            pass
+        assert gc.isenabled()
+        assert gc.get_freeze_count() == 0
+    finally:
+        gc.unfreeze()
+        gc.enable()
+
+
+def test_allocations_are_traced_per_phase(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = hlt.engine.LocalEngine.from_frame(FRAME, 0, 200, 100, max_turns=3)
+    game = hlt.Game("Test", transport=engine.transport(), trace_allocations=True)
+    try:
+        game.update_map()
+        assert game.allocations['parse']
+        assert all('hlt' in str(difference.traceback) for difference in game.allocations['parse'])
+        assert game.allocation_report().startswith("parse: ")
+    finally:
+        tracemalloc.stop()
+
+
+def test_send_command_queue_sends_through_the_transport(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = hlt.engine.LocalEngine.from_frame(FRAME, 0, 200, 100, max_turns=2)
+    game = hlt.Game("Test", transport=engine.transport())
+    game.update_map()
+    game.send_command_queue(["t 0 7 90"])
+    assert engine.command_queues == ["t 0 7 90"]
+
+
+def test_recording_is_closed_when_the_game_ends(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = hlt.engine.LocalEngine.from_frame(FRAME, 0, 200, 100, max_turns=2)
+    game = hlt.Game("Test", history_size=2, transport=engine.transport(), record_to="game.rec")
+    # more ships than the history holds
+    game.history = hlt.history.TurnHistory(2, max_ships=1)
+    while True:
+        try:
+            game.update_map()
+        except hlt.networking.GameOver:
+            break
+        game.send_command_queue([])
+
+    assert game._recorder._file.closed
+    turns = hlt.recorder.load("game.rec").turns
+    assert [turn.turn for turn in turns] == [0, 1, 2]
+    assert len(turns[-1].ships) == len(game.map.all_ships())
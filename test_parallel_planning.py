@@ -0,0 +1,102 @@
+import multiprocessing
+import hlt
+import MyBot
+import parallel_planning
+
+# two players with three and one ships, one free planet and one planet with player 1 docked
+FRAME = ("2 "
+         "0 3 0 10 10 255 0 0 0 0 0 0 1 24 10 255 0 0 0 0 0 0 2 70 40 255 0 0 0 0 0 0 "
+         "1 1 10 80 80 255 0 0 2 1 0 0 "
+         "2 "
+         "0 50 50 1000 5 3 0 1000 0 0 0 "
+         "1 80 85 1000 4 2 0 1000 1 1 1 10")
+
+
+def make_map():
+    game_map = hlt.game_map.Map(0, 120, 100)
+    game_map._parse(FRAME)
+    return game_map
+
+
+def test_map_round_trips_through_arrays():
+    game_map = make_map()
+    rebuilt = hlt.game_map.Map(0, 120, 100)
+    rebuilt._load_arrays(game_map.ship_array(), game_map.planet_array(), [0, 1])
+
+    assert (rebuilt.ship_array() == game_map.ship_array()).all()
+    assert (rebuilt.planet_array() == game_map.planet_array()).all()
+    assert rebuilt.get_planet(1).all_docked_ships()[0].id == 10
+    assert rebuilt.get_planet(1).owner.id == 1
+
+
+def test_parallel_plan_matches_in_process_plan():
+    # our three ships head for the only planet, so strips agree on targets but clash on docking slots
+    game_map = hlt.game_map.Map(0, 240, 160)
+    game_map._parse(FRAME.replace("1 1 10 80 80 255 0 0 2 1", "1 1 10 200 150 255 0 0 0 0").replace(
+        " 2 0 50 50 1000 5 3 0 1000 0 0 0 1 80 85 1000 4 2 0 1000 1 1 1 10", " 1 0 50 50 1000 5 3 0 1000 0 0 0"))
+    planner = parallel_planning.TurnPlanner(game_map, MyBot.plan_ships, MyBot.BotState, MyBot.navigate_to, workers=2)
+    try:
+        parallel = planner.plan(game_map, MyBot.BotState())
+    finally:
+        planner.close()
+
+    expected = MyBot.plan_ships(game_map, game_map.get_me().all_ships(), MyBot.BotState())
+    assert sorted(parallel) == sorted(expected)
+
+
+def test_workers_start_under_spawn():
+    game_map = make_map()
+    hlt.selection.calibrate(game_map, sizes=(8,), repeats=1)
+    planner = parallel_planning.TurnPlanner(game_map, MyBot.plan_ships, MyBot.BotState, MyBot.navigate_to,
+                                            workers=2, context=multiprocessing.get_context('spawn'))
+    try:
+        assert len(planner._processes) == 2
+        assert planner.plan(game_map, MyBot.BotState())
+    finally:
+        planner.close()
+
+
+def test_failing_workers_fall_back_to_in_process_planning():
+    class BrokenContext:
+        def __init__(self):
+            self._context = multiprocessing.get_context()
+            self.started = []
+
+        def Pipe(self):
+            return self._context.Pipe()
+
+        def Process(self, **kwargs):
+            if self.started:
+                raise OSError("no more processes")
+            process = self._context.Process(target=sleep_forever, daemon=True)
+            self.started.append(process)
+            return process
+
+    game_map = make_map()
+    context = BrokenContext()
+    planner = parallel_planning.TurnPlanner(game_map, MyBot.plan_ships, MyBot.BotState, MyBot.navigate_to,
+                                            workers=2, context=context)
+    assert planner._processes == []
+    assert not context.started[0].is_alive()
+    assert not hasattr(planner, '_ships')
+    expected = MyBot.plan_ships(game_map, game_map.get_me().all_ships(), MyBot.BotState())
+    assert sorted(planner.plan(game_map, MyBot.BotState())) == sorted(expected)
+    planner.close()
+
+
+def sleep_forever():
+    import time
+    time.sleep(60)
+
+
+def test_resolve_conflicts_drops_excess_docks_and_clashing_moves():
+    game_map = make_map()
+    commands = ["d 0 1", "d 1 1", "t 0 7 0", "t 1 0 0", "t 2 7 90"]
+
+    # planet 1 has one free spot; ship 0 ends at (17, 10), ship 1 stays at (24, 10)
+    assert parallel_planning.resolve_conflicts(game_map, commands) == ["d 0 1", "t 0 7 0", "t 1 0 0", "t 2 7 90"]
+    assert parallel_planning.resolve_conflicts(game_map, ["t 0 7 0", "t 1 7 180"]) == ["t 0 7 0"]
+    # ship 1 gives way to ship 0, so ship 2 only has to keep clear of ship 0
+    game_map = hlt.game_map.Map(0, 120, 100)
+    game_map._parse(FRAME.replace("1 24 10", "1 17.8 10").replace("2 70 40", "2 18.6 10"))
+    assert parallel_planning.resolve_conflicts(game_map, ["t 0 7 0", "t 1 0 0", "t 2 0 0"]) == ["t 0 7 0", "t 2 0 0"]
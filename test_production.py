@@ -0,0 +1,39 @@
+import hlt
+import production
+
+# player 0 has two ships docked on planet 0 (production 60), planet 1 is free
+FRAME = ("1 0 2 0 45 50 255 0 0 2 0 0 0 1 55 50 255 0 0 2 0 0 0 "
+         "2 0 50 50 1000 3 3 {} 0 1 0 2 0 1 1 80 80 1000 3 3 0 0 0 0 0")
+
+
+def make_map(current_production=60):
+    game_map = hlt.game_map.Map(0, 100, 100)
+    game_map._parse(FRAME.format(current_production))
+    return game_map
+
+
+def test_forecast_spawns_every_six_turns_from_two_docked_ships():
+    forecast = production.ProductionForecast(horizon=20)
+    assert forecast.update(make_map(), turn=10) == 2
+
+    planet_ids, owners, turns, points = forecast.spawns()
+    # 12 more production at 12 per turn, then 72 per ship
+    assert planet_ids.tolist() == [0, 0, 0, 0]
+    assert owners.tolist() == [0, 0, 0, 0]
+    assert turns.tolist() == [11, 17, 23, 29]
+    # spawned towards the map centre, which planet 0 sits on: fall back to +x
+    assert points[0].tolist() == [55, 50]
+
+    player_ids, counts = forecast.fleet_counts(make_map(), horizon=12)
+    assert player_ids.tolist() == [0]
+    assert counts[0, [0, 1, 6, 7, 12]].tolist() == [2, 3, 3, 4, 4]
+
+
+def test_forecast_is_only_recomputed_when_production_changes():
+    forecast = production.ProductionForecast(horizon=20)
+    forecast.update(make_map(60), turn=10)
+    # on schedule: one ship spawned on turn 11, then 24 production by turn 13
+    assert forecast.update(make_map(24), turn=13) == 0
+    assert forecast.spawns()[2].tolist() == [17, 23, 29]
+    # a blocked spawn keeps production from resetting
+    assert forecast.update(make_map(50), turn=14) == 1
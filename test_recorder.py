@@ -0,0 +1,25 @@
+import hlt
+
+
+def test_recording_round_trips(tmp_path):
+    game_map = hlt.game_map.Map(0, 120, 100)
+    game_map._parse("2 0 1 0 10 10 255 0 0 0 0 0 0 1 1 1 80 80 200 1 2 0 0 0 3 "
+                    "1 0 50 50 1000 5 3 0 1000 0 0 0")
+    path = str(tmp_path / "game.rec")
+
+    recorder = hlt.recorder.TurnRecorder(path, 0, 120, 100)
+    recorder.record(0, game_map.ship_array(), game_map.planet_array(), [], {})
+    recorder.record(1, game_map.ship_array()[:1], game_map.planet_array(), ["t 0 7 90", "d 0 0"],
+                    {'parse': 0.001, 'plan': 0.25})
+    recorder.close()
+
+    recording = hlt.recorder.load(path)
+    assert (recording.my_id, recording.width, recording.height) == (0, 120, 100)
+    first, second = recording.turns
+    assert (first.ships == game_map.ship_array()).all()
+    assert (first.planets == game_map.planet_array()).all()
+    assert (first.commands, first.timings) == ([], {})
+    assert second.turn == 1
+    assert len(second.ships) == 1
+    assert second.commands == ["t 0 7 90", "d 0 0"]
+    assert second.timings == {'parse': 0.001, 'plan': 0.25}
@@ -0,0 +1,89 @@
+import hlt
+import batch_eval
+
+
+def make_map():
+    frame = batch_eval.generate_games(1, ships_per_player=60)[0][0]
+    game_map = hlt.game_map.Map(0, frame.width, frame.height)
+    game_map._load_arrays(frame.ships, frame.planets, frame.player_ids)
+    return game_map
+
+
+def test_algorithms_agree():
+    game_map = make_map()
+    mine = game_map.get_me().all_ships()
+    theirs = game_map.get_player(1).all_ships()
+    for ship in mine[:10]:
+        target = hlt.entity.Position(ship.x + 40, ship.y + 10)
+        results = [(game_map.obstacles_between(ship, target, algorithm=algorithm),
+                    game_map.obstacles_between(ship, target, hlt.entity.Ship, algorithm=algorithm),
+                    game_map.entities_within(ship, 20, algorithm=algorithm),
+                    game_map.entities_within(ship, 20, ignore_planets=True, algorithm=algorithm),
+                    game_map.moving_collisions(ship, 7, 0, fudge=5, algorithm=algorithm))
+                   for algorithm in hlt.selection.ALGORITHMS]
+        assert results[0] == results[1] == results[2]
+    results = [hlt.distances.within(mine, theirs, 20, algorithm=algorithm) for algorithm in hlt.selection.ALGORITHMS]
+    assert results[0] == results[1] == results[2]
+    assert any(results[0])
+
+
+def test_choice_follows_measurements():
+    selector = hlt.selection.AlgorithmSelector()
+    assert selector.choose('obstacles', 10) == 'loop'
+    assert selector.choose('obstacles', 10000) == 'kdtree'
+    for count, loop, vectorized in ((10, 1e-6, 1e-5), (1000, 1e-3, 1e-4)):
+        selector.record('obstacles', 'loop', count, loop)
+        selector.record('obstacles', 'vectorized', count, vectorized)
+    assert selector.choose('obstacles', 20) == 'loop'
+    assert selector.choose('obstacles', 500) == 'vectorized'
+    assert selector.choose('obstacles', 100000) == 'vectorized'
+
+
+def test_calibration_measures_every_query():
+    selector = hlt.selection.AlgorithmSelector()
+    hlt.selection.calibrate(make_map(), sizes=(8, 64), repeats=1, target=selector)
+    for query in hlt.selection.QUERIES:
+        for algorithm in hlt.selection.ALGORITHMS:
+            assert selector.estimate(query, algorithm, 30) > 0
+
+
+def test_calibration_stays_with_its_map():
+    calibrated, other = make_map(), make_map()
+    hlt.selection.calibrate(calibrated, sizes=(8,), repeats=1)
+    assert calibrated.selector.estimate('obstacles', 'loop', 8) is not None
+    assert other.selector.estimate('obstacles', 'loop', 8) is None
+    # the proximity query picks through the map of its ships
+    mine = other.get_me().all_ships()
+    assert mine[0].distance_table.selector is other.selector
+
+
+def test_choice_is_estimated_once_per_count_range(monkeypatch):
+    selector = hlt.selection.AlgorithmSelector()
+    selector.record('obstacles', 'loop', 10, 1e-6)
+    selector.record('obstacles', 'vectorized', 10, 1e-5)
+    estimates = []
+    estimate = selector.estimate
+    monkeypatch.setattr(selector, 'estimate', lambda *args: estimates.append(args) or estimate(*args))
+    for _ in range(5):
+        assert selector.choose('obstacles', 40) == 'loop'
+        assert selector.choose('obstacles', 50) == 'loop'
+    assert len(estimates) == len(hlt.selection.ALGORITHMS)
+
+    # new measurements are taken into account
+    selector.record('obstacles', 'vectorized', 40, 1e-7)
+    assert selector.choose('obstacles', 40) == 'vectorized'
+
+
+def test_calibration_times_each_call_on_a_new_distance_table(monkeypatch):
+    game_map = make_map()
+    tables = []
+    link = hlt.game_map.Map._link
+
+    def counted_link(self):
+        link(self)
+        tables.append(self.distances)
+
+    monkeypatch.setattr(hlt.game_map.Map, '_link', counted_link)
+    hlt.selection.calibrate(game_map, sizes=(8,), repeats=2, target=hlt.selection.AlgorithmSelector())
+    # one for the synthetic map, then one per timed call
+    assert len(tables) == 1 + 2 * len(hlt.selection.QUERIES) * len(hlt.selection.ALGORITHMS)
@@ -0,0 +1,52 @@
+import hlt
+import MyBot
+import squads
+from hlt.entity import Ship
+
+
+def make_ships(positions, first_id=0):
+    return [Ship(0, first_id + n, x, y, 255, 0, 0, Ship.DockingStatus.UNDOCKED, 0, 0, 0)
+            for (n, (x, y)) in enumerate(positions)]
+
+
+def test_grid_clusters_join_touching_cells():
+    labels = squads.grid_clusters([(0, 0), (3, 3), (6, 6), (30, 30), (31, 30)], cell_size=4)
+    assert labels[0] == labels[1] == labels[2]
+    assert labels[3] == labels[4] != labels[0]
+
+
+def test_squad_ids_follow_their_ships():
+    tracker = squads.SquadTracker(cell_size=4)
+    first = {len(squad): squad.id for squad in tracker.update(make_ships([(0, 0), (1, 1), (2, 2), (50, 50)]))}
+
+    # the blob moves and a new ship (id 4) joins it
+    moved = make_ships([(8, 7), (7, 8), (9, 9), (50, 50), (8, 10)])
+    second = {len(squad): squad.id for squad in tracker.update(moved)}
+
+    assert second == {4: first[3], 1: first[1]}
+
+
+def test_squad_follows_its_leader():
+    game_map = hlt.game_map.Map(0, 120, 100)
+    game_map._parse("1 0 3 0 10 10 255 0 0 0 0 0 0 1 11 11 255 0 0 0 0 0 0 2 12 10 255 0 0 0 0 0 0 "
+                    "1 0 60 60 1000 5 3 0 1000 0 0 0")
+    ships = game_map.get_me().all_ships()
+    commands = MyBot.plan_ships(game_map, ships, MyBot.BotState())
+
+    assert len(commands) == 3
+    assert len({tuple(command.split()[2:]) for command in commands}) == 1
+
+
+def test_docking_leader_is_not_navigated():
+    game_map = hlt.game_map.Map(0, 120, 100)
+    # the leader (ship 1, in the middle) is close enough to dock, the others are not
+    game_map._parse("1 0 3 0 50 58 255 0 0 0 0 0 0 1 51 57 255 0 0 0 0 0 0 2 52 58 255 0 0 0 0 0 0 "
+                    "1 0 51 51 1000 3 3 0 1000 0 0 0")
+    ships = game_map.get_me().all_ships()
+    state = MyBot.BotState()
+    commands = MyBot.plan_ships(game_map, ships, state)
+
+    assert sorted(command.split()[1] for command in commands) == ['0', '1', '2']
+    assert "d 1 0" in commands
+    # the docking leader is not navigated, so it holds no docking slot
+    assert 1 not in state.docking_slots._assigned
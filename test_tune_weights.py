@@ -0,0 +1,76 @@
+import pytest
+import numpy as np
+import MyBot
+import batch_eval
+import tune_weights
+from hlt import arrays
+from hlt.entity import Ship
+
+
+def make_states():
+    frames = [frame for game in batch_eval.generate_games(10, ships_per_player=5) for frame in game]
+    return tune_weights.build_states(frames)
+
+
+def with_owned_planets(frame):
+    """
+    The frame with planet 0 ours and full, planet 1 ours with room, planet 2 the enemy's
+    """
+    ships, planets = frame.ships.copy(), frame.planets.copy()
+    planets[0:3, arrays.PLANET_OWNED] = 1
+    planets[0:3, arrays.PLANET_OWNER] = (frame.my_id, frame.my_id, frame.my_id + 1)
+    planets[0:3, arrays.PLANET_NUM_DOCKED] = 0
+    mine = np.flatnonzero(ships[:, arrays.SHIP_OWNER] == frame.my_id)
+    theirs = np.flatnonzero(ships[:, arrays.SHIP_OWNER] != frame.my_id)
+    docked = {0: mine[:int(planets[0, arrays.PLANET_DOCKING_SPOTS])], 1: mine[-1:], 2: theirs[:1]}
+    for planet, rows in docked.items():
+        ships[rows, arrays.SHIP_DOCKING_STATUS] = Ship.DockingStatus.DOCKED.value
+        ships[rows, arrays.SHIP_PLANET] = planet
+        planets[planet, arrays.PLANET_NUM_DOCKED] = len(rows)
+    return frame._replace(ships=ships, planets=planets)
+
+
+@pytest.mark.parametrize('owned', [False, True])
+def test_batched_scores_match_the_bot(owned):
+    frame = batch_eval.generate_games(1, ships_per_player=12)[0][0]
+    if owned:
+        frame = with_owned_planets(frame)
+    features, rewards = tune_weights.frame_features(frame)
+    game_map = MyBot.hlt.game_map.Map(frame.my_id, frame.width, frame.height)
+    game_map._load_arrays(frame.ships, frame.planets, frame.player_ids)
+    planets = game_map.all_planets()
+    planet_features = MyBot.all_planet_features(planets, game_map.my_id)
+    assert np.array_equal(features[0, :, 0:4], planet_features[:, 0:4])
+
+    picks = np.argmin(features @ MyBot.PLANET_SCORING_WEIGHTS, axis=1)[:, 0]
+    undocked = [ship for ship in game_map.get_me().all_ships() if ship.docking_status == Ship.DockingStatus.UNDOCKED]
+    assert len(undocked) == len(picks)
+    for ship, pick in zip(undocked, picks):
+        assert MyBot.score_all_planets_for_one_ship(ship, planets, planet_features, {}) is planets[pick]
+
+
+def test_pool_matches_in_process():
+    states = make_states()
+    candidates = np.random.default_rng(1).standard_normal((tune_weights.NUM_FEATURES, 50))
+    local = tune_weights.Evaluator(*states)(candidates)
+    evaluate = tune_weights.Evaluator(*states, workers=2)
+    try:
+        pooled = evaluate(candidates)
+    finally:
+        evaluate.close()
+    assert np.allclose(local, pooled)
+
+
+def test_tuning_does_not_lose_reward():
+    frames = [frame for game in batch_eval.generate_games(10, ships_per_player=5) for frame in game]
+    weights, stats, current = tune_weights.tune(frames, generations=3, population=32, samples=64)
+    assert weights.shape == MyBot.PLANET_SCORING_WEIGHTS.shape
+    assert stats.reward >= current.reward
+    assert 0 <= stats.optimal <= 1
+
+
+def test_tuning_needs_frames(capsys, monkeypatch):
+    monkeypatch.setattr('sys.argv', ['tune_weights.py'])
+    with pytest.raises(SystemExit):
+        tune_weights.main()
+    assert "no frames to tune on" in capsys.readouterr().err
@@ -0,0 +1,30 @@
+import time
+import hlt
+
+
+def test_warm_up_stops_at_the_deadline():
+    game_map = hlt.game_map.Map(0, 100, 100)
+    game_map._parse("1 0 1 0 10 10 255 0 0 0 0 0 0 1 0 30 30 1000 5 3 0 1000 0 0 0")
+    calls = []
+
+    def slow(game_map, deadline):
+        calls.append('slow')
+        time.sleep(0.2)
+
+    ran = hlt.warmup.run([hlt.warmup.warm_kernels, slow, slow], game_map, time.perf_counter() + 0.1)
+
+    assert ran == 2
+    assert calls == ['slow']
+
+
+def test_warm_planning_leaves_the_bot_state_alone():
+    import MyBot
+    from test_parallel_planning import make_map
+    state = MyBot.BotState()
+    before = (state.turn, state.squad_tracker._next_id, dict(state.docking_slots._assigned),
+              state.navigation_cache.hits + state.navigation_cache.misses)
+
+    MyBot.warm_planning(make_map(), time.perf_counter() + 5)
+
+    assert (state.turn, state.squad_tracker._next_id, dict(state.docking_slots._assigned),
+            state.navigation_cache.hits + state.navigation_cache.misses) == before
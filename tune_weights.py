@@ -0,0 +1,258 @@
+"""
+Offline tuning of MyBot.PLANET_SCORING_WEIGHTS.
+
+Every (frame, undocked ship of ours) pair of a set of recorded or generated frames becomes one
+state: a planets x features matrix built like MyBot.score_all_planets_for_one_ship builds it.
+A ship picks the planet with the lowest score, so scoring K candidate weight vectors on S states
+is one batched product (S x planets x features) @ (features x K), followed by an argmin over
+planets. Candidates are judged by the proxy reward of the planets they pick (see planet_rewards).
+
+The search is random search around the current weights followed by a cross-entropy method
+(a diagonal-covariance relative of CMA-ES); candidates of each generation are scored on a pool
+of worker processes, each holding a shard of the states.
+
+    python tune_weights.py [recording ...] [--generate GAMES] [--generations N] [--population K] [--workers W]
+"""
+import argparse
+import collections
+import multiprocessing
+
+import numpy as np
+
+from hlt import arrays, constants
+from hlt.entity import Ship
+import MyBot
+import batch_eval
+import parallel_planning
+
+NUM_FEATURES = MyBot.PLANET_SCORING_WEIGHTS.size
+# largest block of scores (states x planets x candidates) computed at once
+MAX_BLOCK = 1 << 22
+
+#: Evaluation of one candidate: mean reward of the picked planets, mean regret against the
+#: best planet of each state and the fraction of states where the best planet was picked
+Stats = collections.namedtuple('Stats', 'reward regret optimal')
+
+
+def planet_rewards(ship_positions, planets, my_id):
+    """
+    Proxy value of sending each ship to each planet: the docking spots we could use there
+    (free spots of free or our planets, enemy docked ships to destroy on theirs), per turn it
+    takes to get there and dock
+    return array of shape (ships, planets)
+    """
+    owned = planets[:, arrays.PLANET_OWNED] > 0
+    theirs = owned & (planets[:, arrays.PLANET_OWNER] != my_id)
+    free = np.maximum(planets[:, arrays.PLANET_DOCKING_SPOTS] - planets[:, arrays.PLANET_NUM_DOCKED], 0)
+    spots = np.where(theirs, 0.5 * planets[:, arrays.PLANET_NUM_DOCKED], free)
+    distances = np.linalg.norm(ship_positions[:, np.newaxis, :] -
+                               planets[np.newaxis, :, [arrays.PLANET_X, arrays.PLANET_Y]], axis=2)
+    surface = np.maximum(distances - planets[:, arrays.PLANET_RADIUS], 0)
+    return spots / (surface / constants.MAX_SPEED + constants.DOCK_TURNS)
+
+
+def frame_features(frame):
+    """
+    Scoring features and proxy rewards of every undocked ship of ours in the frame.
+    Other ships' targets are not known offline, so the target count feature is 0.
+    return features (ships x planets x NUM_FEATURES) and rewards (ships x planets)
+    """
+    ships, planets = frame.ships, frame.planets
+    mine = ships[(ships[:, arrays.SHIP_OWNER] == frame.my_id) &
+                 (ships[:, arrays.SHIP_DOCKING_STATUS] == Ship.DockingStatus.UNDOCKED.value)]
+    positions = mine[:, [arrays.SHIP_X, arrays.SHIP_Y]]
+
+    owned = planets[:, arrays.PLANET_OWNED] > 0
+    is_mine = owned & (planets[:, arrays.PLANET_OWNER] == frame.my_id)
+    is_others = (owned & ~is_mine).astype(float)
+    is_full = planets[:, arrays.PLANET_NUM_DOCKED] >= planets[:, arrays.PLANET_DOCKING_SPOTS]
+    distances = np.linalg.norm(positions[:, np.newaxis, :] -
+                               planets[np.newaxis, :, [arrays.PLANET_X, arrays.PLANET_Y]], axis=2)
+
+    features = np.zeros((len(mine), len(planets), NUM_FEATURES))
+    features[:, :, 0] = is_mine & ~is_full
+    features[:, :, 1] = is_mine & is_full
+    features[:, :, 2] = is_others
+    features[:, :, 3] = (0.5 - is_others) * planets[:, arrays.PLANET_RADIUS]
+    features[:, :, 5] = distances
+    features[:, :, 6] = distances < MyBot.PLANET_ATTRACTION_THRESHOLD
+    return features, planet_rewards(positions, planets, frame.my_id)
+
+
+def build_states(frames):
+    """
+    Stack the states of all frames, padding to the largest number of planets
+    return features (S x planets x NUM_FEATURES), valid (S x planets) and rewards (S x planets)
+    """
+    per_frame = [frame_features(frame) for frame in frames]
+    per_frame = [(features, rewards) for (features, rewards) in per_frame if len(features)]
+    if not per_frame:
+        raise ValueError("None of the frames has ships of ours to score planets for")
+    num_planets = max(features.shape[1] for (features, _) in per_frame)
+    num_states = sum(len(features) for (features, _) in per_frame)
+    features = np.zeros((num_states, num_planets, NUM_FEATURES))
+    valid = np.zeros((num_states, num_planets), dtype=bool)
+    rewards = np.zeros((num_states, num_planets))
+    start = 0
+    for states, frame_rewards in per_frame:
+        stop = start + len(states)
+        features[start:stop, :states.shape[1]] = states
+        valid[start:stop, :states.shape[1]] = True
+        rewards[start:stop, :frame_rewards.shape[1]] = frame_rewards
+        start = stop
+    return features, valid, rewards
+
+
+def score_candidates(features, valid, rewards, candidates):
+    """
+    Pick a planet for every state with every candidate, in blocks of states
+    return the summed reward, regret and number of optimal picks of each candidate (3 x K)
+    """
+    totals = np.zeros((3, candidates.shape[1]))
+    best = np.where(valid, rewards, -np.inf).max(axis=1)
+    block = max(1, MAX_BLOCK // (features.shape[1] * candidates.shape[1]))
+    for start in range(0, len(features), block):
+        stop = start + block
+        # states x planets x candidates
+        scores = features[start:stop] @ candidates
+        scores[~valid[start:stop]] = np.inf
+        picks = np.argmin(scores, axis=1)
+        picked = np.take_along_axis(rewards[start:stop], picks, axis=1)
+        totals[0] += picked.sum(axis=0)
+        totals[1] += (best[start:stop, np.newaxis] - picked).sum(axis=0)
+        totals[2] += np.isclose(picked, best[start:stop, np.newaxis]).sum(axis=0)
+    return totals
+
+
+# this worker's shard of the states
+_shard = None
+
+
+def _init_worker(features, valid, rewards):
+    global _shard
+    _shard = (features, valid, rewards)
+
+
+def _score_shard(candidates):
+    return score_candidates(*_shard, candidates)
+
+
+class Evaluator:
+    """
+    Scores batches of candidate weight vectors on all states, split into shards over a pool
+    of worker processes when there is more than one worker
+    """
+
+    def __init__(self, features, valid, rewards, workers=1):
+        self.num_states = len(features)
+        self.workers = min(workers, self.num_states)
+        self._pools = []
+        if self.workers <= 1:
+            self._shard = (features, valid, rewards)
+            return
+        context = multiprocessing.get_context()
+        bounds = np.linspace(0, self.num_states, self.workers + 1).astype(int)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            # one single-process pool per shard, so every shard is sent once
+            self._pools.append(context.Pool(
+                1, _init_worker, (features[start:stop], valid[start:stop], rewards[start:stop])))
+
+    def __call__(self, candidates):
+        """
+        candidates is NUM_FEATURES x K
+        return a list of Stats, one per candidate
+        """
+        if self._pools:
+            results = [pool.apply_async(_score_shard, (candidates,)) for pool in self._pools]
+            totals = sum(result.get() for result in results)
+        else:
+            totals = score_candidates(*self._shard, candidates)
+        totals = totals / self.num_states
+        return [Stats(*column) for column in totals.T.tolist()]
+
+    def close(self):
+        for pool in self._pools:
+            pool.close()
+            pool.join()
+        self._pools = []
+
+
+def random_search(evaluate, center, scale, samples, rng):
+    """
+    Evaluate samples candidates drawn around center (relative Gaussian noise of the given scale)
+    return candidates (NUM_FEATURES x samples) and their Stats
+    """
+    noise = rng.standard_normal((len(center), samples))
+    candidates = center[:, np.newaxis] * (1 + scale * noise)
+    return candidates, evaluate(candidates)
+
+
+def cross_entropy_search(evaluate, center, scale=0.5, generations=20, population=256, elite_fraction=0.1,
+                         rng=None):
+    """
+    Cross-entropy method: sample a generation from a diagonal Gaussian, refit the Gaussian to
+    the candidates with the highest reward, repeat
+    return the best candidate seen (a NUM_FEATURES vector) and its Stats
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    mean = np.asarray(center, dtype=float)
+    std = np.abs(mean) * scale + 1e-3
+    elite = max(2, int(population * elite_fraction))
+    best, best_stats = mean, evaluate(mean[:, np.newaxis])[0]
+    for _ in range(generations):
+        candidates = mean[:, np.newaxis] + std[:, np.newaxis] * rng.standard_normal((len(mean), population))
+        stats = evaluate(candidates)
+        order = np.argsort([-stat.reward for stat in stats])[:elite]
+        if stats[order[0]].reward > best_stats.reward:
+            best, best_stats = candidates[:, order[0]], stats[order[0]]
+        mean = candidates[:, order].mean(axis=1)
+        std = candidates[:, order].std(axis=1) + 1e-3
+    return best, best_stats
+
+
+def tune(frames, generations=20, population=256, samples=1024, workers=1, seed=0):
+    """
+    Tune the weights on the given frames, starting from MyBot.PLANET_SCORING_WEIGHTS
+    return the best weights (as a column like PLANET_SCORING_WEIGHTS), their Stats, and the Stats of the current weights
+    """
+    rng = np.random.default_rng(seed)
+    evaluate = Evaluator(*build_states(frames), workers=workers)
+    try:
+        current = MyBot.PLANET_SCORING_WEIGHTS[:, 0].astype(float)
+        current_stats = evaluate(current[:, np.newaxis])[0]
+        candidates, stats = random_search(evaluate, current, 1.0, samples, rng)
+        start = int(np.argmax([stat.reward for stat in stats]))
+        best, best_stats = cross_entropy_search(
+            evaluate, candidates[:, start], generations=generations, population=population, rng=rng)
+        if stats[start].reward > best_stats.reward:
+            best, best_stats = candidates[:, start], stats[start]
+    finally:
+        evaluate.close()
+    return best[:, np.newaxis], best_stats, current_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune PLANET_SCORING_WEIGHTS on recorded or generated frames")
+    parser.add_argument('recordings', nargs='*', help="recorded games to tune on (see hlt.recorder)")
+    parser.add_argument('--generate', type=int, default=0, help="number of random frames to add")
+    parser.add_argument('--generations', type=int, default=20)
+    parser.add_argument('--population', type=int, default=256)
+    parser.add_argument('--samples', type=int, default=1024, help="random search samples")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=0, help="worker processes, 0 for one per available core")
+    args = parser.parse_args()
+
+    frames = [frame for path in args.recordings for frame in batch_eval.load_game(path)]
+    frames.extend(frame for game in batch_eval.generate_games(args.generate, seed=args.seed) for frame in game)
+    if not frames:
+        parser.error("no frames to tune on: give recordings or --generate N")
+    weights, stats, current = tune(frames, args.generations, args.population, args.samples,
+                                   args.workers or parallel_planning.available_cores(), args.seed)
+    print("{} frames".format(len(frames)))
+    print("current: reward {:.4f} regret {:.4f} optimal {:.1%}".format(*current))
+    print("best:    reward {:.4f} regret {:.4f} optimal {:.1%}".format(*stats))
+    print("PLANET_SCORING_WEIGHTS = np.array({})".format(np.round(weights, 3).tolist()))
+
+
+if __name__ == "__main__":
+    main()